@@ -5,13 +5,89 @@ A Python module for parsing GEDCOM genealogy files and extracting
 story-worthy elements for documentary generation.
 """
 
+import io
 import re
+import sys
+from collections import Counter
 from datetime import datetime
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple, Set
 from enum import Enum
+from operator import itemgetter
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Fallback for lines the fast tokenizer can't split cleanly (indentation, tabs, runs of spaces)
+_LINE_RE = re.compile(r'^\s*(\d+)\s+(@\w+@\s+)?(\w+)(\s+(.*))?$')
+
+_YEAR_RE = re.compile(r'\b(1[0-9]{3}|2[0-9]{3})\b')
+_DAY_MONTH_YEAR_RE = re.compile(r'^\d{1,2} \w+ \d{4}$')
+
+
+def _parse_year(date: Optional[str]) -> Optional[int]:
+    """Extract the first four-digit year from a GEDCOM date value"""
+    if date:
+        year_match = _YEAR_RE.search(date)
+        if year_match:
+            return int(year_match.group(1))
+    return None
+
+
+def _format_narrative_date(date: Optional[str]) -> Optional[str]:
+    """Convert a GEDCOM date value to narrative-friendly form"""
+    if not date:
+        return None
+    
+    # Handle different date formats
+    if len(date) == 4 and date.isdecimal():
+        return f"in {date}"
+    elif _DAY_MONTH_YEAR_RE.match(date):
+        return f"on {date}"
+    elif "ABT" in date:
+        return date.replace("ABT", "around")
+    elif "BEF" in date:
+        return date.replace("BEF", "before")
+    elif "AFT" in date:
+        return date.replace("AFT", "after")
+    
+    return f"on {date}"
+
+
+def _tokenize_line(line: str) -> Optional[Tuple[int, Optional[str], str, Optional[str]]]:
+    """Split a GEDCOM line into (level, xref, tag, value)
+    
+    GEDCOM lines are LEVEL SP [XREF SP] TAG [SP VALUE], so a couple of
+    str.split calls cover well-formed input; anything else goes through
+    the regex.
+    """
+    parts = line.split(' ', 2)
+    if len(parts) > 1 and parts[0].isdecimal():
+        if parts[1].startswith('@'):
+            xref = parts[1]
+            rest = parts[2].split(' ', 1) if len(parts) == 3 else None
+            # Same xref shape as the regex: @ word characters @
+            if rest and rest[0].isalnum() and len(xref) > 2 and xref.endswith('@') and xref[1:-1].isalnum():
+                value = rest[1] if len(rest) == 2 else None
+                # A run of spaces before the value is left to the regex
+                if not value or value[0] != ' ':
+                    return int(parts[0]), xref, sys.intern(rest[0]), value or None
+        elif parts[1].isalnum():
+            value = parts[2] if len(parts) == 3 else None
+            if not value or value[0] != ' ':
+                return int(parts[0]), None, sys.intern(parts[1]), value or None
+    
+    match = _LINE_RE.match(line)
+    if not match:
+        return None
+    
+    xref = match.group(2).strip() if match.group(2) else None
+    return int(match.group(1)), xref, sys.intern(match.group(3)), match.group(5) or None
+
 
 class EventType(Enum):
     """Types of life events we track for storytelling"""
@@ -30,6 +106,12 @@ class EventType(Enum):
     RESIDENCE = "RESI"
 
 
+# Level-1 INDI tags that open a new life event
+_INDI_EVENT_TAGS: Dict[str, EventType] = {
+    tag: EventType(tag) for tag in ("BIRT", "DEAT", "MARR", "IMMI", "EMIG", "OCCU", "EDUC", "MILI")
+}
+
+
 class StoryTheme(Enum):
     """Narrative themes that can be detected from the data"""
     IMMIGRATION = "immigration"
@@ -44,7 +126,7 @@ class StoryTheme(Enum):
     FAMILY_BUSINESS = "family_business"
 
 
-@dataclass
+@dataclass(slots=True)
 class Location:
     """Represents a geographic location with parsing for storytelling"""
     full_text: str
@@ -52,36 +134,32 @@ class Location:
     county: Optional[str] = None
     state: Optional[str] = None
     country: Optional[str] = None
+    display_name: str = field(default="", init=False)
     
     def __post_init__(self):
         """Parse location string into components"""
-        parts = [p.strip() for p in self.full_text.split(',')]
-        
-        if len(parts) >= 4:
-            self.city = parts[0]
-            self.county = parts[1]
-            self.state = parts[2]
-            self.country = parts[3]
-        elif len(parts) == 3:
-            self.city = parts[0]
-            self.state = parts[1]
-            self.country = parts[2]
-        elif len(parts) == 2:
-            self.city = parts[0]
-            self.country = parts[1]
-        elif len(parts) == 1:
-            self.country = parts[0]
+        # Split once and only strip the parts that end up in a field
+        parts = self.full_text.split(',')
+        count = len(parts)
+        
+        if count >= 4:
+            self.city, self.county, self.state, self.country = [p.strip() for p in parts[:4]]
+        elif count == 3:
+            self.city, self.state, self.country = [p.strip() for p in parts]
+        elif count == 2:
+            self.city, self.country = parts[0].strip(), parts[1].strip()
+        else:
+            self.country = parts[0].strip()
+        
+        region = self.state or self.country
+        self.display_name = f"{self.city}, {region}" if self.city and region else self.full_text
     
     def get_display_name(self) -> str:
         """Get a narrative-friendly location name"""
-        if self.city and self.state:
-            return f"{self.city}, {self.state}"
-        elif self.city and self.country:
-            return f"{self.city}, {self.country}"
-        return self.full_text
+        return self.display_name
 
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     """Represents a life event with narrative context"""
     event_type: EventType
@@ -89,36 +167,30 @@ class Event:
     location: Optional[Location] = None
     description: Optional[str] = None
     age_at_event: Optional[int] = None
+    year: Optional[int] = None
+    narrative_date: Optional[str] = None
+    
+    def __post_init__(self):
+        """Derive year and narrative date up front so callers never re-scan the date"""
+        if self.date:
+            self.set_date(self.date)
+    
+    def set_date(self, date: Optional[str]):
+        """Set the raw date along with its derived year and narrative form"""
+        self.date = date
+        self.year = _parse_year(date)
+        self.narrative_date = _format_narrative_date(date)
     
     def get_year(self) -> Optional[int]:
         """Extract year from date string"""
-        if self.date:
-            year_match = re.search(r'\b(1[0-9]{3}|2[0-9]{3})\b', self.date)
-            if year_match:
-                return int(year_match.group(1))
-        return None
+        return self.year
     
     def get_narrative_date(self) -> str:
         """Convert date to narrative-friendly format"""
-        if not self.date:
-            return "on an unknown date"
-        
-        # Handle different date formats
-        if re.match(r'^\d{4}$', self.date):
-            return f"in {self.date}"
-        elif re.match(r'^\d{1,2} \w+ \d{4}$', self.date):
-            return f"on {self.date}"
-        elif "ABT" in self.date:
-            return self.date.replace("ABT", "around")
-        elif "BEF" in self.date:
-            return self.date.replace("BEF", "before")
-        elif "AFT" in self.date:
-            return self.date.replace("AFT", "after")
-        
-        return f"on {self.date}"
+        return self.narrative_date or "on an unknown date"
 
 
-@dataclass
+@dataclass(slots=True)
 class Individual:
     """Represents a person with all their life events and relationships"""
     id: str
@@ -129,6 +201,35 @@ class Individual:
     family_child: List[str] = field(default_factory=list)  # Families where child
     family_spouse: List[str] = field(default_factory=list)  # Families where spouse
     notes: List[str] = field(default_factory=list)
+    events_by_type: Dict[EventType, List[Event]] = field(init=False, repr=False, compare=False)
+    _indexed_events: int = field(default=0, init=False, repr=False, compare=False)
+    _themes: Optional[Set[StoryTheme]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.events_by_type = {}
+        self._sync_events()
+    
+    def add_event(self, event: Event):
+        """Record an event, keeping the per-type index in sync"""
+        self.events.append(event)
+        self._sync_events()
+    
+    def _sync_events(self) -> Dict[EventType, List[Event]]:
+        """Bring the per-type index and theme memo up to date with events
+        
+        Events appended to the list directly are picked up here too; the
+        index is rebuilt if events were removed.
+        """
+        count = len(self.events)
+        if count != self._indexed_events:
+            if count < self._indexed_events:
+                self.events_by_type = {}
+                self._indexed_events = 0
+            for event in self.events[self._indexed_events:]:
+                self.events_by_type.setdefault(event.event_type, []).append(event)
+            self._indexed_events = count
+            self._themes = None
+        return self.events_by_type
     
     def get_full_name(self) -> str:
         """Get narrative-friendly full name"""
@@ -138,17 +239,13 @@ class Individual:
     
     def get_birth_year(self) -> Optional[int]:
         """Get birth year for age calculations"""
-        for event in self.events:
-            if event.event_type == EventType.BIRTH:
-                return event.get_year()
-        return None
+        births = self._sync_events().get(EventType.BIRTH)
+        return births[0].year if births else None
     
     def get_death_year(self) -> Optional[int]:
         """Get death year for lifespan calculations"""
-        for event in self.events:
-            if event.event_type == EventType.DEATH:
-                return event.get_year()
-        return None
+        deaths = self._sync_events().get(EventType.DEATH)
+        return deaths[0].year if deaths else None
     
     def get_lifespan(self) -> Optional[int]:
         """Calculate lifespan in years"""
@@ -160,6 +257,10 @@ class Individual:
     
     def get_story_themes(self) -> Set[StoryTheme]:
         """Identify narrative themes from life events"""
+        events_by_type = self._sync_events()
+        if self._themes is not None:
+            return self._themes
+        
         themes = set()
         
         # Check lifespan
@@ -171,15 +272,13 @@ class Individual:
                 themes.add(StoryTheme.LONG_LIFE)
         
         # Check for immigration
-        for event in self.events:
-            if event.event_type in [EventType.IMMIGRATION, EventType.EMIGRATION]:
-                themes.add(StoryTheme.IMMIGRATION)
-            elif event.event_type == EventType.MILITARY:
-                themes.add(StoryTheme.MILITARY_SERVICE)
+        if EventType.IMMIGRATION in events_by_type or EventType.EMIGRATION in events_by_type:
+            themes.add(StoryTheme.IMMIGRATION)
+        if EventType.MILITARY in events_by_type:
+            themes.add(StoryTheme.MILITARY_SERVICE)
         
         # Check marriages
-        marriage_count = sum(1 for e in self.events if e.event_type == EventType.MARRIAGE)
-        if marriage_count > 1:
+        if len(events_by_type.get(EventType.MARRIAGE, ())) > 1:
             themes.add(StoryTheme.MULTIPLE_MARRIAGES)
         
         # Check family size (as parent)
@@ -187,10 +286,11 @@ class Individual:
             # This would need family data to determine number of children
             pass
         
+        self._themes = themes
         return themes
 
 
-@dataclass
+@dataclass(slots=True)
 class Family:
     """Represents a family unit with parents and children"""
     id: str
@@ -218,14 +318,27 @@ class GEDCOMParser:
         self.current_entity = None
         self.current_entity_type = None
         self.current_event = None
+        # Identical PLAC values share one Location instance
+        self._location_cache: Dict[str, Location] = {}
         
     def parse_file(self, filepath: str) -> Dict:
-        """Parse GEDCOM file and extract story elements"""
-        with open(filepath, 'r', encoding='utf-8-sig') as file:
-            lines = file.readlines()
+        """Parse GEDCOM file and extract story elements
         
+        The file is streamed line by line so memory stays flat regardless of
+        file size; utf-8-sig drops a leading BOM if the exporter wrote one.
+        """
+        with open(filepath, 'r', encoding='utf-8-sig') as file:
+            return self._parse_lines(file)
+    
+    def parse_string(self, content: str) -> Dict:
+        """Parse GEDCOM content already held in memory"""
+        # Universal newlines, matching how parse_file reads
+        return self._parse_lines(io.StringIO(content, newline=None))
+    
+    def _parse_lines(self, lines) -> Dict:
+        parse_line = self._parse_line
         for line in lines:
-            self._parse_line(line.strip())
+            parse_line(line.rstrip())
         
         # Post-process to identify story themes
         story_data = self._extract_story_data()
@@ -238,14 +351,11 @@ class GEDCOMParser:
             return
         
         # GEDCOM line format: LEVEL [XREF] TAG [VALUE]
-        match = re.match(r'^(\d+)\s+(@\w+@\s+)?(\w+)(\s+(.*))?$', line)
-        if not match:
+        tokens = _tokenize_line(line)
+        if not tokens:
             return
         
-        level = int(match.group(1))
-        xref = match.group(2).strip() if match.group(2) else None
-        tag = match.group(3)
-        value = match.group(5) if match.group(5) else None
+        level, xref, tag, value = tokens
         
         # Handle level 0 (new entity)
         if level == 0:
@@ -261,54 +371,81 @@ class GEDCOMParser:
                 self.current_entity = None
                 self.current_entity_type = None
         
-        # Handle individual properties
-        elif self.current_entity_type == "INDI" and level == 1:
-            if tag == "NAME":
-                self._parse_name(value)
-            elif tag == "SEX":
-                self.current_entity.sex = value
-            elif tag in ["BIRT", "DEAT", "MARR", "IMMI", "EMIG", "OCCU", "EDUC", "MILI"]:
-                self.current_event = Event(event_type=EventType(tag))
-            elif tag == "FAMC":
-                self.current_entity.family_child.append(value)
-            elif tag == "FAMS":
-                self.current_entity.family_spouse.append(value)
-            elif tag == "NOTE":
-                if value:
-                    self.current_entity.notes.append(value)
-        
-        # Handle family properties
-        elif self.current_entity_type == "FAM" and level == 1:
-            if tag == "HUSB":
-                self.current_entity.husband_id = value
-            elif tag == "WIFE":
-                self.current_entity.wife_id = value
-            elif tag == "CHIL":
-                self.current_entity.children_ids.append(value)
-            elif tag == "MARR":
-                self.current_event = Event(event_type=EventType.MARRIAGE)
-            elif tag == "DIV":
-                self.current_event = Event(event_type=EventType.DIVORCE)
-        
-        # Handle event properties
-        elif self.current_event and level == 2:
-            if tag == "DATE":
-                self.current_event.date = value
-            elif tag == "PLAC":
-                self.current_event.location = Location(value)
-            elif tag == "NOTE":
-                self.current_event.description = value
-        
-        # Save completed events
-        if level <= 1 and self.current_event:
-            if self.current_entity_type == "INDI":
-                self.current_entity.events.append(self.current_event)
-            elif self.current_entity_type == "FAM":
-                if self.current_event.event_type == EventType.MARRIAGE:
-                    self.current_entity.marriage_event = self.current_event
-                elif self.current_event.event_type == EventType.DIVORCE:
-                    self.current_entity.divorce_event = self.current_event
-            self.current_event = None
+        # Everything else is routed by (scope, level, tag); event sub-records
+        # take precedence at level 2 while an event is open
+        else:
+            # A new level 1 record closes the event opened by the previous one
+            if level == 1 and self.current_event:
+                self._save_current_event()
+            
+            scope = "EVENT" if level == 2 and self.current_event else self.current_entity_type
+            handler = self._HANDLERS.get((scope, level, tag))
+            if handler:
+                handler(self, tag, value)
+    
+    # Tag handlers: each receives the tag and value of a level 1/2 line
+    
+    def _handle_name(self, tag: str, value: Optional[str]):
+        self._parse_name(value)
+    
+    def _handle_sex(self, tag: str, value: Optional[str]):
+        self.current_entity.sex = sys.intern(value) if value else value
+    
+    def _handle_indi_event(self, tag: str, value: Optional[str]):
+        self.current_event = Event(event_type=_INDI_EVENT_TAGS[tag])
+    
+    def _handle_famc(self, tag: str, value: Optional[str]):
+        self.current_entity.family_child.append(value)
+    
+    def _handle_fams(self, tag: str, value: Optional[str]):
+        self.current_entity.family_spouse.append(value)
+    
+    def _handle_indi_note(self, tag: str, value: Optional[str]):
+        if value:
+            self.current_entity.notes.append(value)
+    
+    def _handle_husb(self, tag: str, value: Optional[str]):
+        self.current_entity.husband_id = value
+    
+    def _handle_wife(self, tag: str, value: Optional[str]):
+        self.current_entity.wife_id = value
+    
+    def _handle_chil(self, tag: str, value: Optional[str]):
+        self.current_entity.children_ids.append(value)
+    
+    def _handle_fam_event(self, tag: str, value: Optional[str]):
+        self.current_event = Event(event_type=EventType(tag))
+    
+    def _handle_date(self, tag: str, value: Optional[str]):
+        self.current_event.set_date(value)
+    
+    def _handle_plac(self, tag: str, value: Optional[str]):
+        location = self._location_cache.get(value)
+        if location is None:
+            location = self._location_cache[value] = Location(value)
+        self.current_event.location = location
+    
+    def _handle_event_note(self, tag: str, value: Optional[str]):
+        self.current_event.description = value
+    
+    # Tag handlers keyed by (scope, level, tag), where scope is the current
+    # entity type or "EVENT" for sub-records of an open event
+    _HANDLERS = {
+        ("INDI", 1, "NAME"): _handle_name,
+        ("INDI", 1, "SEX"): _handle_sex,
+        ("INDI", 1, "FAMC"): _handle_famc,
+        ("INDI", 1, "FAMS"): _handle_fams,
+        ("INDI", 1, "NOTE"): _handle_indi_note,
+        ("FAM", 1, "HUSB"): _handle_husb,
+        ("FAM", 1, "WIFE"): _handle_wife,
+        ("FAM", 1, "CHIL"): _handle_chil,
+        ("FAM", 1, "MARR"): _handle_fam_event,
+        ("FAM", 1, "DIV"): _handle_fam_event,
+        ("EVENT", 2, "DATE"): _handle_date,
+        ("EVENT", 2, "PLAC"): _handle_plac,
+        ("EVENT", 2, "NOTE"): _handle_event_note,
+    }
+    _HANDLERS.update(dict.fromkeys([("INDI", 1, tag) for tag in _INDI_EVENT_TAGS], _handle_indi_event))
     
     def _parse_name(self, name_value: str):
         """Parse name into given names and surname"""
@@ -316,10 +453,11 @@ class GEDCOMParser:
             return
         
         # GEDCOM format: Given Names /Surname/
-        match = re.match(r'^([^/]*)\s*/([^/]*)/\s*(.*)$', name_value)
-        if match:
-            self.current_entity.given_names = match.group(1).strip()
-            self.current_entity.surname = match.group(2).strip()
+        given, _, rest = name_value.partition('/')
+        surname, closed, _ = rest.partition('/')
+        if closed:
+            self.current_entity.given_names = given.strip()
+            self.current_entity.surname = surname.strip()
         else:
             # Handle names without slashes
             parts = name_value.split()
@@ -329,8 +467,21 @@ class GEDCOMParser:
             else:
                 self.current_entity.given_names = name_value
     
+    def _save_current_event(self):
+        """Attach the open event to the current entity"""
+        if self.current_entity_type == "INDI":
+            self.current_entity.add_event(self.current_event)
+        elif self.current_entity_type == "FAM":
+            if self.current_event.event_type == EventType.MARRIAGE:
+                self.current_entity.marriage_event = self.current_event
+            elif self.current_event.event_type == EventType.DIVORCE:
+                self.current_entity.divorce_event = self.current_event
+        self.current_event = None
+    
     def _save_current_entity(self):
         """Save the current entity to appropriate collection"""
+        if self.current_event:
+            self._save_current_event()
         if self.current_entity:
             if self.current_entity_type == "INDI":
                 self.individuals[self.current_entity.id] = self.current_entity
@@ -351,26 +502,63 @@ class GEDCOMParser:
             "statistics": {}
         }
         
-        # Process individuals
+        # Single pass over individuals and their events; everything the
+        # timeline, journey and statistics need is accumulated here
+        all_themes = set()
+        all_events = []
+        location_timeline = []
+        location_counts = Counter()
+        all_years = []
+        lifespans = []
+        
         for ind_id, individual in self.individuals.items():
+            name = individual.get_full_name()
+            lifespan = individual.get_lifespan()
+            themes = individual.get_story_themes()
+            all_themes.update(themes)
+            if lifespan and lifespan > 0:
+                lifespans.append(lifespan)
+            
             ind_data = {
-                "name": individual.get_full_name(),
-                "lifespan": individual.get_lifespan(),
+                "name": name,
+                "lifespan": lifespan,
                 "birth_year": individual.get_birth_year(),
                 "death_year": individual.get_death_year(),
                 "events": [],
-                "themes": list(individual.get_story_themes())
+                "themes": [theme.value for theme in themes]
             }
             
             # Add significant events
             for event in individual.events:
+                year = event.year
+                location = event.location
+                event_type = event.event_type.value
                 event_data = {
-                    "type": event.event_type.value,
+                    "type": event_type,
                     "date": event.get_narrative_date(),
-                    "year": event.get_year(),
-                    "location": event.location.get_display_name() if event.location else None
+                    "year": year,
+                    "location": location.display_name if location else None
                 }
                 ind_data["events"].append(event_data)
+                
+                if location:
+                    location_counts[location.display_name] += 1
+                
+                if year:
+                    all_years.append(year)
+                    all_events.append({
+                        "person": name,
+                        "type": event_type,
+                        "year": year,
+                        "description": self._create_event_description(individual, event)
+                    })
+                    if location:
+                        location_timeline.append({
+                            "year": year,
+                            "location": location,
+                            "person": name,
+                            "event_type": event_type
+                        })
             
             story_data["individuals"][ind_id] = ind_data
         
@@ -384,39 +572,24 @@ class GEDCOMParser:
             if family.marriage_event:
                 fam_data["marriage"] = {
                     "date": family.marriage_event.get_narrative_date(),
-                    "location": family.marriage_event.location.get_display_name() if family.marriage_event.location else None
+                    "location": family.marriage_event.location.display_name if family.marriage_event.location else None
                 }
             
             story_data["families"][fam_id] = fam_data
         
         # Extract narrative themes
-        all_themes = set()
-        for individual in self.individuals.values():
-            all_themes.update(individual.get_story_themes())
         story_data["narrative_themes"] = [theme.value for theme in all_themes]
         
-        # Extract key events for timeline
-        all_events = []
-        for individual in self.individuals.values():
-            for event in individual.events:
-                if event.get_year():
-                    all_events.append({
-                        "person": individual.get_full_name(),
-                        "type": event.event_type.value,
-                        "year": event.get_year(),
-                        "description": self._create_event_description(individual, event)
-                    })
-        
         # Sort events by year
-        all_events.sort(key=lambda x: x["year"])
+        all_events.sort(key=itemgetter("year"))
         story_data["key_events"] = all_events
         
         # Extract geographic journey
-        locations = self._extract_migration_pattern()
+        locations = self._extract_migration_pattern(location_timeline)
         story_data["geographic_journey"] = locations
         
         # Calculate statistics
-        story_data["statistics"] = self._calculate_statistics()
+        story_data["statistics"] = self._calculate_statistics(all_years, lifespans, location_counts)
         
         return story_data
     
@@ -437,33 +610,21 @@ class GEDCOMParser:
         desc = descriptions.get(event.event_type, f"{name} experienced {event.event_type.value}")
         
         if event.location:
-            desc += f" in {event.location.get_display_name()}"
+            desc += f" in {event.location.display_name}"
         
         return desc
     
-    def _extract_migration_pattern(self) -> List[Dict]:
+    def _extract_migration_pattern(self, location_timeline: List[Dict]) -> List[Dict]:
         """Extract geographic movement patterns for narrative"""
         locations = []
-        location_timeline = []
-        
-        # Collect all locations with dates
-        for individual in self.individuals.values():
-            for event in individual.events:
-                if event.location and event.get_year():
-                    location_timeline.append({
-                        "year": event.get_year(),
-                        "location": event.location,
-                        "person": individual.get_full_name(),
-                        "event_type": event.event_type.value
-                    })
         
         # Sort by year
-        location_timeline.sort(key=lambda x: x["year"])
+        location_timeline.sort(key=itemgetter("year"))
         
         # Identify unique locations and movements
         seen_locations = set()
         for item in location_timeline:
-            loc_key = item["location"].get_display_name()
+            loc_key = item["location"].display_name
             if loc_key not in seen_locations:
                 seen_locations.add(loc_key)
                 locations.append({
@@ -489,37 +650,33 @@ class GEDCOMParser:
         
         return significance_map.get(event_type, "significant location")
     
-    def _calculate_statistics(self) -> Dict:
+    def _calculate_statistics(
+        self, all_years: List[int], lifespans: List[int], location_counts: Counter
+    ) -> Dict:
         """Calculate interesting statistics for narrative color"""
+        date_range = self._calculate_date_range(all_years)
         stats = {
             "total_individuals": len(self.individuals),
             "total_families": len(self.families),
-            "generations": self._estimate_generations(),
-            "average_lifespan": self._calculate_average_lifespan(),
+            "generations": self._estimate_generations(date_range),
+            "average_lifespan": self._calculate_average_lifespan(lifespans),
             "average_children_per_family": self._calculate_average_children(),
-            "most_common_locations": self._find_common_locations(),
-            "date_range": self._calculate_date_range()
+            "most_common_locations": self._find_common_locations(location_counts),
+            "date_range": date_range
         }
         
         return stats
     
-    def _estimate_generations(self) -> int:
+    def _estimate_generations(self, date_range: Dict[str, Optional[int]]) -> int:
         """Estimate number of generations in the tree"""
         # Simple estimation based on date range
-        date_range = self._calculate_date_range()
         if date_range["earliest"] and date_range["latest"]:
             years = date_range["latest"] - date_range["earliest"]
             return max(1, years // 25)  # Assume 25 years per generation
         return 1
     
-    def _calculate_average_lifespan(self) -> Optional[float]:
+    def _calculate_average_lifespan(self, lifespans: List[int]) -> Optional[float]:
         """Calculate average lifespan for narrative context"""
-        lifespans = []
-        for individual in self.individuals.values():
-            lifespan = individual.get_lifespan()
-            if lifespan and lifespan > 0:
-                lifespans.append(lifespan)
-        
         if lifespans:
             return sum(lifespans) / len(lifespans)
         return None
@@ -532,30 +689,12 @@ class GEDCOMParser:
         total_children = sum(family.get_child_count() for family in self.families.values())
         return total_children / len(self.families)
     
-    def _find_common_locations(self) -> List[Tuple[str, int]]:
+    def _find_common_locations(self, location_counts: Counter) -> List[Tuple[str, int]]:
         """Find most common locations for geographic narrative"""
-        location_counts = {}
-        
-        for individual in self.individuals.values():
-            for event in individual.events:
-                if event.location:
-                    loc_name = event.location.get_display_name()
-                    location_counts[loc_name] = location_counts.get(loc_name, 0) + 1
-        
-        # Sort by frequency
-        sorted_locations = sorted(location_counts.items(), key=lambda x: x[1], reverse=True)
-        return sorted_locations[:5]  # Top 5 locations
+        return location_counts.most_common(5)  # Top 5 locations
     
-    def _calculate_date_range(self) -> Dict[str, Optional[int]]:
+    def _calculate_date_range(self, all_years: List[int]) -> Dict[str, Optional[int]]:
         """Calculate earliest and latest dates in the tree"""
-        all_years = []
-        
-        for individual in self.individuals.values():
-            for event in individual.events:
-                year = event.get_year()
-                if year:
-                    all_years.append(year)
-        
         if all_years:
             return {
                 "earliest": min(all_years),
@@ -565,6 +704,16 @@ class GEDCOMParser:
         return {"earliest": None, "latest": None}
 
 
+def dumps_story_data(story_data: Dict) -> str:
+    """Serialize story data to indented JSON, using orjson when it is installed"""
+    if orjson is not None:
+        # Same fallback as json.dumps below for types neither handles natively
+        return orjson.dumps(
+            story_data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(story_data, indent=2, default=str)
+
+
 class StoryGenerator:
     """Generate narrative elements from parsed GEDCOM data"""
     
@@ -658,4 +807,4 @@ if __name__ == "__main__":
     # print("Opening Narrative:")
     # print(opening)
     # print("\nStory Data:")
-    # print(json.dumps(story_data, indent=2, default=str))
+    # print(dumps_story_data(story_data))
@@ -3,14 +3,63 @@ Media endpoints
 """
 
 from typing import Any
+import hashlib
+import os
+import tempfile
+import uuid
+
+import aiofiles
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.config import settings
 from app.models.models import User
+from app.utils.s3 import S3_URL_PREFIX, generate_presigned_post, upload_file_to_s3
 
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+def _check_extension(filename: str) -> str:
+    file_extension = os.path.splitext(filename)[1].lower()
+    allowed_extensions = (
+        settings.ALLOWED_IMAGE_EXTENSIONS + settings.ALLOWED_VIDEO_EXTENSIONS
+    )
+    if file_extension not in allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
+        )
+    return file_extension
+
+
+@router.post("/presign")
+def presign_media_upload(
+    *,
+    current_user: User = Depends(deps.get_current_active_user),
+    filename: str,
+    content_type: str = "application/octet-stream",
+) -> Any:
+    """
+    Get a presigned POST for uploading a media file directly to S3
+
+    The file never passes through the API; post the returned fields and
+    the file to the url, after which it is served from file_url.
+    """
+    s3_key = f"media/{current_user.id}/{uuid.uuid4()}{_check_extension(filename)}"
+    try:
+        presigned = generate_presigned_post(
+            s3_key=s3_key,
+            max_size=settings.MAX_UPLOAD_SIZE,
+            content_type=content_type
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {**presigned, "s3_key": s3_key, "file_url": S3_URL_PREFIX + s3_key}
+
 
 @router.post("/upload")
 async def upload_media(
@@ -21,6 +70,46 @@ async def upload_media(
 ) -> Any:
     """
     Upload media file
+
+    The upload is streamed to disk in fixed-size chunks and hashed in the
+    same pass, so memory use stays at one chunk regardless of file size.
     """
-    # TODO: Implement media upload
-    return {"filename": file.filename, "size": file.size}
+    file_extension = _check_extension(file.filename)
+
+    with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
+        temp_path = temp_file.name
+
+    try:
+        sha256 = hashlib.sha256()
+        size = 0
+        async with aiofiles.open(temp_path, 'wb') as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB"
+                    )
+                sha256.update(chunk)
+                await out.write(chunk)
+
+        try:
+            file_url = await upload_file_to_s3(
+                file_path=temp_path,
+                s3_key=f"media/{current_user.id}/{uuid.uuid4()}{file_extension}",
+                content_type=file.content_type or "application/octet-stream"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload file: {str(e)}"
+            )
+    finally:
+        os.unlink(temp_path)
+
+    return {
+        "filename": file.filename,
+        "size": size,
+        "sha256": sha256.hexdigest(),
+        "url": file_url
+    }
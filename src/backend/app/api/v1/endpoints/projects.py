@@ -3,10 +3,13 @@ Projects endpoints
 """
 
 from typing import Any, List
+import asyncio
 import os
+import re
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
 from app.api import deps
@@ -14,12 +17,14 @@ from app.core.config import settings
 from app.crud import crud_project
 from app.models.models import User, Project
 from app.schemas import project as project_schema
-from app.services.gedcom_processor import process_gedcom_file
-from app.services.video_generator import generate_documentary
-from app.utils.s3 import upload_file_to_s3
+from app.utils.s3 import S3_URL_PREFIX, file_exists_in_s3, generate_presigned_post, upload_file_to_s3
+from app.worker import process_project
 
 router = APIRouter()
 
+MAX_UPLOAD_SIZE = settings.MAX_UPLOAD_SIZE
+_GEDCOM_EXT_RE = re.compile(r"\.(ged|gedcom)\Z", re.IGNORECASE)
+
 
 @router.get("/", response_model=List[project_schema.Project])
 def read_projects(
@@ -34,14 +39,18 @@ def read_projects(
     projects = crud_project.project.get_multi_by_owner(
         db=db, owner_id=current_user.id, skip=skip, limit=limit
     )
-    return projects
+    # Serialize straight to JSON bytes, bypassing jsonable_encoder
+    adapter = project_schema.PROJECT_LIST_ADAPTER
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(projects, from_attributes=True)),
+        media_type="application/json"
+    )
 
 
 @router.post("/", response_model=project_schema.Project)
 async def create_project(
     *,
     db: Session = Depends(deps.get_db),
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(deps.get_current_active_user),
     title: str = Form(...),
     description: str = Form(None),
@@ -51,29 +60,34 @@ async def create_project(
     Create new project with GEDCOM file upload
     """
     # Validate file extension
-    if not gedcom_file.filename.lower().endswith(('.ged', '.gedcom')):
+    if not _GEDCOM_EXT_RE.search(gedcom_file.filename or ""):
         raise HTTPException(
             status_code=400,
             detail="Invalid file type. Please upload a GEDCOM file (.ged or .gedcom)"
         )
     
-    # Check file size
-    contents = await gedcom_file.read()
-    if len(contents) > settings.MAX_UPLOAD_SIZE:
+    # Check file size (recorded while the multipart body was spooled; measure
+    # the spooled file when the size wasn't recorded)
+    file_size = gedcom_file.size
+    if file_size is None:
+        file_size = gedcom_file.file.seek(0, os.SEEK_END)
+        gedcom_file.file.seek(0)
+    if file_size > MAX_UPLOAD_SIZE:
         raise HTTPException(
             status_code=400,
-            detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE / 1024 / 1024}MB"
+            detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE / 1024 / 1024}MB"
         )
     
     # Generate unique filename
     file_extension = os.path.splitext(gedcom_file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
+    gedcom_s3_key = f"gedcom/{current_user.id}/{unique_filename}"
     
-    # Upload to S3
+    # Stream the spooled upload to S3 without reading it into memory
     try:
         gedcom_url = await upload_file_to_s3(
-            file_content=contents,
-            file_name=f"gedcom/{current_user.id}/{unique_filename}",
+            file_obj=gedcom_file.file,
+            s3_key=gedcom_s3_key,
             content_type="text/plain"
         )
     except Exception as e:
@@ -88,17 +102,72 @@ async def create_project(
         description=description,
         gedcom_file_url=gedcom_url
     )
-    project = crud_project.project.create_with_owner(
+    project = await asyncio.to_thread(
+        crud_project.project.create_with_owner,
         db=db, obj_in=project_in, owner_id=current_user.id
     )
     
-    # Process GEDCOM file in background
-    background_tasks.add_task(
-        process_project_async,
-        project_id=project.id,
-        gedcom_content=contents.decode('utf-8')
+    # Hand processing to the Celery worker pool
+    await asyncio.to_thread(process_project.delay, project.id, gedcom_s3_key)
+    
+    return project
+
+
+@router.post("/presign", response_model=project_schema.GedcomUploadTicket)
+def presign_gedcom_upload(
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get a presigned POST for uploading a GEDCOM file directly to S3
+    """
+    gedcom_s3_key = f"gedcom/{current_user.id}/{uuid.uuid4()}.ged"
+    try:
+        presigned = generate_presigned_post(
+            s3_key=gedcom_s3_key,
+            max_size=MAX_UPLOAD_SIZE
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {**presigned, "s3_key": gedcom_s3_key}
+
+
+@router.post("/from-upload", response_model=project_schema.Project)
+async def create_project_from_upload(
+    *,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+    project_in: project_schema.ProjectCreateFromUpload,
+) -> Any:
+    """
+    Create new project from a GEDCOM file already uploaded via /presign
+    """
+    gedcom_s3_key = project_in.gedcom_s3_key
+    if not gedcom_s3_key.startswith(f"gedcom/{current_user.id}/"):
+        raise HTTPException(status_code=400, detail="Invalid GEDCOM upload key")
+    
+    # Only queue work for a file that was actually uploaded
+    try:
+        uploaded = await asyncio.to_thread(file_exists_in_s3, gedcom_s3_key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not uploaded:
+        raise HTTPException(status_code=400, detail="GEDCOM file has not been uploaded")
+    
+    project = await asyncio.to_thread(
+        crud_project.project.create_with_owner,
+        db=db,
+        obj_in=project_schema.ProjectCreate(
+            title=project_in.title,
+            description=project_in.description,
+            gedcom_file_url=S3_URL_PREFIX + gedcom_s3_key
+        ),
+        owner_id=current_user.id
     )
     
+    # Hand processing to the Celery worker pool
+    await asyncio.to_thread(process_project.delay, project.id, gedcom_s3_key)
+    
     return project
 
 
@@ -120,88 +189,41 @@ def read_project(
     return project
 
 
-@router.delete("/{project_id}")
-def delete_project(
+@router.get("/{project_id}/transcript", response_model=project_schema.ProjectTranscript)
+def read_project_transcript(
     *,
     db: Session = Depends(deps.get_db),
     project_id: int,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Delete a project
+    Get the full narration transcript for a project
     """
     project = crud_project.project.get(db=db, id=project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    crud_project.project.remove(db=db, id=project_id)
-    return {"message": "Project deleted successfully"}
+    return {
+        "project_id": project_id,
+        "transcript": crud_project.project.get_transcript(db=db, project_id=project_id)
+    }
 
 
-async def process_project_async(project_id: int, gedcom_content: str):
+@router.delete("/{project_id}", status_code=204)
+def delete_project(
+    *,
+    db: Session = Depends(deps.get_db),
+    project_id: int,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Response:
     """
-    Background task to process GEDCOM file and generate video
+    Delete a project
     """
-    from app.db.database import SessionLocal
-    
-    db = SessionLocal()
-    try:
-        # Update project status to processing
-        project = crud_project.project.get(db=db, id=project_id)
-        if not project:
-            return
-        
-        crud_project.project.update(
-            db=db,
-            db_obj=project,
-            obj_in={"status": "processing"}
-        )
-        
-        # Process GEDCOM file
-        parsed_data = await process_gedcom_file(gedcom_content)
-        
-        # Update project with parsed data
-        crud_project.project.update(
-            db=db,
-            db_obj=project,
-            obj_in={
-                "parsed_data": parsed_data,
-                "story_themes": parsed_data.get("narrative_themes", [])
-            }
-        )
-        
-        # Generate video documentary
-        video_result = await generate_documentary(
-            project_id=project_id,
-            parsed_data=parsed_data,
-            title=project.title
-        )
-        
-        # Update project with video results
-        crud_project.project.update(
-            db=db,
-            db_obj=project,
-            obj_in={
-                "status": "completed",
-                "video_url": video_result["video_url"],
-                "thumbnail_url": video_result["thumbnail_url"],
-                "transcript": video_result["transcript"],
-                "video_duration": video_result["duration"]
-            }
-        )
-        
-    except Exception as e:
-        # Update project status to failed
-        if project:
-            crud_project.project.update(
-                db=db,
-                db_obj=project,
-                obj_in={
-                    "status": "failed",
-                    "error_message": str(e)
-                }
-            )
-    finally:
-        db.close()
+    if not crud_project.project.remove(db=db, id=project_id, owner_id=current_user.id):
+        # Nothing deleted: tell a missing project apart from someone else's
+        owner_id = db.query(Project.owner_id).filter(Project.id == project_id).scalar()
+        if owner_id is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return Response(status_code=204)
@@ -2,53 +2,195 @@
 CRUD operations for projects
 """
 
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
 
-from app.models.models import Project
+import orjson
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime, delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.db.cache import redis_client
+from app.models.models import Project, ProjectTranscript
 from app.schemas.project import ProjectCreate, ProjectUpdate
 
+PROJECT_CACHE_TTL = 300  # seconds
+
+# Columns whose JSON form needs converting back when a cached row is loaded
+_COLUMN_LOADERS = {
+    column.key: datetime.fromisoformat
+    for column in Project.__table__.columns
+    if isinstance(column.type, DateTime)
+}
+
+
+def _project_key(id: int) -> str:
+    return f"project:{id}"
+
+
+def _owner_index_key(owner_id: int) -> str:
+    # Hash of "skip:limit" -> JSON list of project ids
+    return f"owner:{owner_id}:projects"
+
+
+def _dump_project(obj: Project) -> bytes:
+    return orjson.dumps({c.key: getattr(obj, c.key) for c in Project.__table__.columns})
+
+
+def _load_project(db: Session, data: bytes) -> Project:
+    """Rebuild a cached row and attach it to the session without a SELECT"""
+    values = orjson.loads(data)
+    for key, loader in _COLUMN_LOADERS.items():
+        if values.get(key) is not None:
+            values[key] = loader(values[key])
+    obj = Project(**values)
+    make_transient_to_detached(obj)
+    return db.merge(obj, load=False)
+
+
+def _cache_projects(objs: List[Project]) -> None:
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for obj in objs:
+            pipe.setex(_project_key(obj.id), PROJECT_CACHE_TTL, _dump_project(obj))
+        pipe.execute()
+    except RedisError:
+        pass
+
+
+def _invalidate(*, id: Optional[int] = None, owner_id: Optional[int] = None) -> None:
+    keys = []
+    if id is not None:
+        keys.append(_project_key(id))
+    if owner_id is not None:
+        keys.append(_owner_index_key(owner_id))
+    try:
+        redis_client.delete(*keys)
+    except RedisError:
+        pass
+
 
 class CRUDProject:
     def get(self, db: Session, id: int) -> Optional[Project]:
-        return db.query(Project).filter(Project.id == id).first()
+        try:
+            cached = redis_client.get(_project_key(id))
+        except RedisError:
+            cached = None
+        if cached:
+            return _load_project(db, cached)
+
+        obj = db.query(Project).filter(Project.id == id).first()
+        if obj:
+            _cache_projects([obj])
+        return obj
 
     def get_multi_by_owner(
         self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
     ) -> List[Project]:
-        return (
+        index_key = _owner_index_key(owner_id)
+        page = f"{skip}:{limit}"
+        try:
+            cached_ids = redis_client.hget(index_key, page)
+        except RedisError:
+            cached_ids = None
+
+        if cached_ids is not None:
+            ids = orjson.loads(cached_ids)
+            try:
+                rows = redis_client.mget([_project_key(id) for id in ids]) if ids else []
+            except RedisError:
+                rows = [None] * len(ids)
+
+            by_id: Dict[int, Project] = {
+                id: _load_project(db, row) for id, row in zip(ids, rows) if row
+            }
+            missing = [id for id in ids if id not in by_id]
+            if missing:
+                fetched = db.query(Project).filter(Project.id.in_(missing)).all()
+                _cache_projects(fetched)
+                by_id.update((obj.id, obj) for obj in fetched)
+            return [by_id[id] for id in ids if id in by_id]
+
+        projects = (
             db.query(Project)
             .filter(Project.owner_id == owner_id)
+            .order_by(Project.created_at.desc())
             .offset(skip)
             .limit(limit)
             .all()
         )
+        _cache_projects(projects)
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hset(index_key, page, orjson.dumps([obj.id for obj in projects]))
+            pipe.expire(index_key, PROJECT_CACHE_TTL)
+            pipe.execute()
+        except RedisError:
+            pass
+        return projects
 
     def create_with_owner(
         self, db: Session, *, obj_in: ProjectCreate, owner_id: int
     ) -> Project:
-        db_obj = Project(**obj_in.dict(), owner_id=owner_id)
+        db_obj = Project(**obj_in.model_dump(exclude_unset=True), owner_id=owner_id)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        _invalidate(owner_id=owner_id)
         return db_obj
 
     def update(
-        self, db: Session, *, db_obj: Project, obj_in: ProjectUpdate
+        self, db: Session, *, db_obj: Project, obj_in: Union[ProjectUpdate, Dict[str, Any]]
     ) -> Project:
-        update_data = obj_in.dict(exclude_unset=True)
-        for field in update_data:
-            setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        # One UPDATE ... RETURNING round trip instead of UPDATE + refresh SELECT
+        stmt = (
+            update(Project)
+            .where(Project.id == db_obj.id)
+            .values(**update_data)
+            .returning(Project)
+        )
+        db_obj = db.execute(stmt).scalar_one()
+        values = {c.key: getattr(db_obj, c.key) for c in Project.__table__.columns}
         db.commit()
-        db.refresh(db_obj)
+        # commit() expires the row RETURNING just loaded; restore its values as
+        # committed state so reading them afterwards doesn't SELECT it again
+        for key, value in values.items():
+            set_committed_value(db_obj, key, value)
+        _invalidate(id=values["id"], owner_id=values["owner_id"])
         return db_obj
 
-    def remove(self, db: Session, *, id: int) -> Project:
-        obj = db.query(Project).get(id)
-        db.delete(obj)
+    def remove(self, db: Session, *, id: int, owner_id: int) -> bool:
+        """Delete an owner's project in one statement; False if nothing matched"""
+        result = db.execute(
+            delete(Project).where(Project.id == id, Project.owner_id == owner_id)
+        )
+        db.commit()
+        if not result.rowcount:
+            return False
+        _invalidate(id=id, owner_id=owner_id)
+        return True
+
+    def get_transcript(self, db: Session, *, project_id: int) -> Optional[str]:
+        return db.execute(
+            select(ProjectTranscript.transcript)
+            .where(ProjectTranscript.project_id == project_id)
+        ).scalar_one_or_none()
+
+    def set_transcript(self, db: Session, *, project_id: int, transcript: str) -> None:
+        stmt = insert(ProjectTranscript).values(project_id=project_id, transcript=transcript)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ProjectTranscript.project_id],
+                set_={"transcript": stmt.excluded.transcript}
+            )
+        )
         db.commit()
-        return obj
 
 
 project = CRUDProject()
@@ -9,7 +9,14 @@ from passlib.context import CryptContext
 from app.models.models import User
 from app.schemas.user import UserCreate, UserUpdate
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id for new hashes; bcrypt is kept only to verify (and upgrade) old ones
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1,
+)
 
 
 class CRUDUser:
@@ -39,8 +46,14 @@ class CRUDUser:
         user = self.get_by_email(db, email=email)
         if not user:
             return None
-        if not self.verify_password(password, user.hashed_password):
+        verified, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            # Rehash legacy bcrypt passwords with argon2 on successful login
+            user.hashed_password = new_hash
+            db.add(user)
+            db.commit()
         return user
 
     def is_active(self, user: User) -> bool:
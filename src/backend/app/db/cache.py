@@ -0,0 +1,10 @@
+"""
+Redis cache client configuration
+"""
+
+import redis
+
+from app.core.config import settings
+
+# Shared client; redis-py keeps an internal connection pool
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
@@ -2,22 +2,43 @@
 Database configuration and session management
 """
 
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 
-# Create engine
+# orjson for JSONB columns; NON_STR_KEYS keeps stdlib json's int-key behaviour
+_json_options = dict(
+    json_serializer=lambda v: orjson.dumps(v, option=orjson.OPT_NON_STR_KEYS).decode(),
+    json_deserializer=orjson.loads
+)
+
+# Create engine for the request path
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=20,
+    max_overflow=40,
+    pool_recycle=1800,
+    # Fail slow queries fast instead of tying up a request worker
+    connect_args={"options": "-c statement_timeout=5000"},
+    **_json_options
+)
+
+# Celery tasks hold a session for minutes, so they get unpooled connections
+# of their own rather than competing with request handlers for the pool
+worker_engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=NullPool,
+    **_json_options
 )
 
-# Create session factory
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+WorkerSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=worker_engine)
 
 # Create base class for models
 Base = declarative_base()
@@ -2,7 +2,8 @@
 SQLAlchemy models for LegacyLabs
 """
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, JSON, Enum as SQLEnum
+from sqlalchemy import Boolean, CheckConstraint, Column, Computed, ForeignKey, Index, Integer, String, DateTime, Text, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -35,6 +36,12 @@ class VideoStatus(str, enum.Enum):
     FAILED = "failed"
 
 
+def _one_of(column: str, enum_class: type, name: str) -> CheckConstraint:
+    """CHECK constraint limiting a String column to an enum's values"""
+    values = ", ".join(f"'{member.value}'" for member in enum_class)
+    return CheckConstraint(f"{column} IN ({values})", name=name)
+
+
 class User(Base):
     """User model"""
     __tablename__ = "users"
@@ -46,8 +53,8 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
-    role = Column(SQLEnum(UserRole), default=UserRole.USER)
-    subscription_tier = Column(SQLEnum(SubscriptionTier), default=SubscriptionTier.FREE)
+    role = Column(String(16), default=UserRole.USER.value)
+    subscription_tier = Column(String(16), default=SubscriptionTier.FREE.value)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -61,6 +68,11 @@ class User(Base):
     company_name = Column(String)
     company_type = Column(String)  # funeral_home, genealogy_service, etc.
     partner_code = Column(String, unique=True, index=True)
+    
+    __table_args__ = (
+        _one_of("role", UserRole, "ck_users_role"),
+        _one_of("subscription_tier", SubscriptionTier, "ck_users_subscription_tier"),
+    )
 
 
 class Project(Base):
@@ -74,16 +86,16 @@ class Project(Base):
     
     # GEDCOM data
     gedcom_file_url = Column(String)
-    parsed_data = Column(JSON)  # Stored parsed GEDCOM data
+    parsed_data = Column(JSONB)  # Stored parsed GEDCOM data
     
     # Story configuration
     narrator_voice = Column(String, default="documentary_male")
     video_duration = Column(Integer, default=300)  # seconds
-    story_themes = Column(JSON)  # List of identified themes
-    custom_settings = Column(JSON)  # User preferences
+    story_themes = Column(JSONB)  # List of identified themes
+    custom_settings = Column(JSONB)  # User preferences
     
     # Status
-    status = Column(SQLEnum(VideoStatus), default=VideoStatus.PENDING)
+    status = Column(String(16), default=VideoStatus.PENDING.value)
     processing_started_at = Column(DateTime(timezone=True))
     processing_completed_at = Column(DateTime(timezone=True))
     error_message = Column(Text)
@@ -91,7 +103,7 @@ class Project(Base):
     # Output
     video_url = Column(String)
     thumbnail_url = Column(String)
-    transcript = Column(Text)
+    transcript_url = Column(String)  # WebVTT in S3; full text lives in project_transcripts
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -99,8 +111,35 @@ class Project(Base):
     
     # Relationships
     owner = relationship("User", back_populates="projects")
-    media_assets = relationship("MediaAsset", back_populates="project", cascade="all, delete-orphan")
-    edits = relationship("ProjectEdit", back_populates="project", cascade="all, delete-orphan")
+    # Child rows are removed by ON DELETE CASCADE so a project delete is one statement
+    media_assets = relationship("MediaAsset", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    edits = relationship("ProjectEdit", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Backs the per-owner project listing, newest first
+    __table_args__ = (
+        Index("ix_projects_owner_id_created_at", owner_id, created_at.desc()),
+        # Only unfinished jobs are indexed, which keeps the stale-job sweep small
+        Index(
+            "ix_projects_status_active",
+            status,
+            processing_started_at,
+            postgresql_where=text("status IN ('pending', 'processing')")
+        ),
+        _one_of("status", VideoStatus, "ck_projects_status"),
+    )
+
+
+class ProjectTranscript(Base):
+    """Narration transcript, kept out of the projects row so listings stay narrow"""
+    __tablename__ = "project_transcripts"
+    
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    transcript = Column(Text)
+    tsv = Column(TSVECTOR, Computed("to_tsvector('english', coalesce(transcript, ''))", persisted=True))
+    
+    __table_args__ = (
+        Index("ix_project_transcripts_tsv", tsv, postgresql_using="gin"),
+    )
 
 
 class MediaAsset(Base):
@@ -108,7 +147,7 @@ class MediaAsset(Base):
     __tablename__ = "media_assets"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     asset_type = Column(String)  # image, video, audio
     file_url = Column(String, nullable=False)
     thumbnail_url = Column(String)
@@ -125,7 +164,7 @@ class MediaAsset(Base):
     
     # User annotations
     caption = Column(Text)
-    person_tags = Column(JSON)  # List of person IDs from GEDCOM
+    person_tags = Column(JSONB)  # List of person IDs from GEDCOM
     date_taken = Column(DateTime)
     location = Column(String)
     
@@ -141,11 +180,11 @@ class ProjectEdit(Base):
     __tablename__ = "project_edits"
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Edit details
     edit_type = Column(String)  # transcript, media, settings, etc.
-    edit_data = Column(JSON)  # Stores the actual edit
+    edit_data = Column(JSONB)  # Stores the actual edit
     
     # Version tracking
     version = Column(Integer, default=1)
@@ -169,7 +208,7 @@ class Subscription(Base):
     stripe_subscription_id = Column(String, unique=True)
     
     # Subscription details
-    tier = Column(SQLEnum(SubscriptionTier), nullable=False)
+    tier = Column(String(16), nullable=False)
     status = Column(String)  # active, canceled, past_due, etc.
     
     # Billing
@@ -187,6 +226,10 @@ class Subscription(Base):
     
     # Relationships
     user = relationship("User", back_populates="subscription")
+    
+    __table_args__ = (
+        _one_of("tier", SubscriptionTier, "ck_subscriptions_tier"),
+    )
 
 
 class Template(Base):
@@ -200,16 +243,20 @@ class Template(Base):
     # Template configuration
     story_type = Column(String)  # immigration, military, large_family, etc.
     default_duration = Column(Integer)  # seconds
-    scene_templates = Column(JSON)  # List of scene configurations
-    music_options = Column(JSON)  # List of suitable music tracks
+    scene_templates = Column(JSONB)  # List of scene configurations
+    music_options = Column(JSONB)  # List of suitable music tracks
     
     # Availability
     is_active = Column(Boolean, default=True)
-    tier_required = Column(SQLEnum(SubscriptionTier), default=SubscriptionTier.STARTER)
+    tier_required = Column(String(16), default=SubscriptionTier.STARTER.value)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        _one_of("tier_required", SubscriptionTier, "ck_templates_tier_required"),
+    )
 
 
 class StockFootage(Base):
@@ -226,7 +273,7 @@ class StockFootage(Base):
     era = Column(String)  # 1800s, 1900s, modern, etc.
     region = Column(String)  # north_america, europe, etc.
     theme = Column(String)  # immigration, family, work, etc.
-    tags = Column(JSON)  # List of tags
+    tags = Column(JSONB)  # List of tags
     
     # Technical details
     duration = Column(Integer)  # seconds
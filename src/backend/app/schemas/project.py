@@ -2,9 +2,9 @@
 Project schemas
 """
 
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 
 class ProjectBase(BaseModel):
@@ -18,12 +18,24 @@ class ProjectCreate(ProjectBase):
     gedcom_file_url: Optional[str] = None
 
 
+class ProjectCreateFromUpload(BaseModel):
+    title: str
+    description: Optional[str] = None
+    gedcom_s3_key: str
+
+
+class GedcomUploadTicket(BaseModel):
+    url: str
+    fields: Dict[str, str]
+    s3_key: str
+
+
 class ProjectUpdate(ProjectBase):
     title: Optional[str] = None
     status: Optional[str] = None
     video_url: Optional[str] = None
     thumbnail_url: Optional[str] = None
-    transcript: Optional[str] = None
+    transcript_url: Optional[str] = None
     parsed_data: Optional[dict] = None
     story_themes: Optional[List[str]] = None
     error_message: Optional[str] = None
@@ -49,7 +61,16 @@ class Project(ProjectInDBBase):
 
 
 class ProjectDetail(ProjectInDBBase):
-    transcript: Optional[str]
+    transcript_url: Optional[str]
     parsed_data: Optional[dict]
     processing_started_at: Optional[datetime]
     processing_completed_at: Optional[datetime]
+
+
+class ProjectTranscript(BaseModel):
+    project_id: int
+    transcript: Optional[str]
+
+
+# Built once so list responses reuse the compiled pydantic-core serializer
+PROJECT_LIST_ADAPTER = TypeAdapter(List[Project])
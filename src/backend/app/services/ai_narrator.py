@@ -4,38 +4,89 @@ Generates compelling narratives using Claude or GPT-4
 """
 
 import os
-from typing import Dict, Any, List
+import hashlib
+import re
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
 import anthropic
 import openai
-from elevenlabs import generate, set_api_key, voices, save
+from elevenlabs.client import AsyncElevenLabs
+import aiofiles
+import httpx
 import asyncio
 import tempfile
 import uuid
+import wave
+
+import orjson
+from redis.exceptions import RedisError
 
 from app.core.config import settings
+from app.db.cache import redis_client
 from app.utils.s3 import upload_file_to_s3
 
 
 # Initialize AI clients
-anthropic_client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-openai.api_key = settings.OPENAI_API_KEY
-set_api_key(settings.ELEVENLABS_API_KEY)
-
-
-async def generate_narration_script(parsed_data: Dict[str, Any], title: str) -> Dict[str, Any]:
+anthropic_client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+SCRIPT_MODEL = "claude-3-opus-20240229"
+
+# Generated scripts are reused for identical prompts, e.g. on task retries
+SCRIPT_CACHE_TTL = 86400  # seconds
+
+# Standard-tier scripts are generated through the Message Batches API at half
+# price; queued requests are submitted together on a beat schedule
+NARRATION_BATCH_QUEUE = "narration:batch:queue"
+NARRATION_BATCHES = "narration:batches"
+NARRATION_BATCH_SIZE = 100
+
+# Seconds Claude runs alone before GPT-4 is raced against it; near Claude's
+# p95 so the hedge only doubles cost on slow requests
+SCRIPT_HEDGE_DELAY = 30
+
+# Streamed scripts must start within SCRIPT_HEDGE_DELAY and finish within
+# this many seconds, or narration falls back to the hedged staged path
+SCRIPT_STREAM_TIMEOUT = 120
+
+# One TTS client for the whole process so HTTPS connections are kept alive
+# and reused instead of paying a TLS handshake per request
+elevenlabs_client = AsyncElevenLabs(
+    api_key=settings.ELEVENLABS_API_KEY,
+    httpx_client=httpx.AsyncClient(
+        http2=True,
+        timeout=60,
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=300)
+    )
+)
+
+# Raw 16-bit mono PCM: the video encoder compresses it to AAC exactly once,
+# and the stream's byte count gives the exact duration
+TTS_MODEL_ID = "eleven_turbo_v2_5"
+TTS_OUTPUT_FORMAT = "pcm_44100"
+TTS_SAMPLE_RATE = 44100
+TTS_SAMPLE_WIDTH = 2  # bytes
+TTS_MAX_CONCURRENCY = 5  # parallel segment requests, kept under the ElevenLabs limit
+
+
+async def generate_narration_script(
+    parsed_data: Dict[str, Any],
+    title: str,
+    project_id: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Generate a professional documentary narration script using AI
+    
+    A script already generated for project_id by a Message Batch is used
+    as-is.
     """
     
     # Build comprehensive prompt
     prompt = build_narration_prompt(parsed_data, title)
     
-    # Try Claude first, fallback to GPT-4
-    try:
-        script_data = await generate_with_claude(prompt)
-    except Exception as e:
-        print(f"Claude generation failed: {e}, falling back to GPT-4")
-        script_data = await generate_with_gpt4(prompt)
+    script_data = await get_cached_script(prompt, project_id)
+    if script_data is None:
+        script_data = await generate_script_text(prompt)
+        await cache_script(prompt, script_data)
     
     # Parse and structure the script
     structured_script = parse_script_response(script_data)
@@ -52,8 +103,41 @@ async def generate_narration_script(parsed_data: Dict[str, Any], title: str) ->
     }
 
 
+# Static instructions sent ahead of every family's data. Kept byte-identical
+# across requests so Claude can serve them from its prompt cache.
+NARRATION_INSTRUCTIONS = """You are a professional documentary narrator creating a script for a family history documentary. The documentary's title and the family's data follow these instructions.
+
+INSTRUCTIONS:
+1. Create a compelling 5-7 minute documentary narration (750-1000 words)
+2. Structure the narration with clear segments:
+   - Opening: Hook the viewer with an emotional or intriguing statement
+   - Family Overview: Introduce the scope and scale of the family
+   - Geographic Journey: Tell the story of migration and settlement
+   - Key Moments: Highlight 3-5 pivotal events or people
+   - Themes: Weave in the narrative themes naturally
+   - Legacy: Conclude with the family's lasting impact
+3. Use a warm, professional documentary tone (think Ken Burns style)
+4. Include specific dates, places, and names where provided
+5. Create emotional resonance without being overly sentimental
+6. Use vivid language that paints pictures
+7. Maintain historical accuracy while telling a compelling story
+
+Format your response as:
+[SEGMENT: Opening]
+[Duration: X seconds]
+[Text of opening segment]
+
+[SEGMENT: Family Overview]
+[Duration: X seconds]
+[Text of family overview segment]
+
+[Continue for all segments...]
+
+Remember: This is a treasured family keepsake. Make every word count."""
+
+
 def build_narration_prompt(parsed_data: Dict[str, Any], title: str) -> str:
-    """Build comprehensive prompt for AI narrator"""
+    """Build the family-specific part of the narrator prompt"""
     
     # Extract key information
     stats = parsed_data.get('statistics', {})
@@ -63,7 +147,7 @@ def build_narration_prompt(parsed_data: Dict[str, Any], title: str) -> str:
     insights = parsed_data.get('insights', {})
     individuals = list(parsed_data.get('individuals', {}).values())[:5]  # Key individuals
     
-    prompt = f"""You are a professional documentary narrator creating a script for a family history documentary titled "{title}".
+    prompt = f"""DOCUMENTARY TITLE: "{title}"
 
 FAMILY DATA:
 - Total individuals: {stats.get('total_individuals', 'Unknown')}
@@ -85,39 +169,31 @@ KEY INDIVIDUALS:
 {format_individuals_for_prompt(individuals)}
 
 INSIGHTS:
-{format_insights_for_prompt(insights)}
-
-INSTRUCTIONS:
-1. Create a compelling 5-7 minute documentary narration (750-1000 words)
-2. Structure the narration with clear segments:
-   - Opening: Hook the viewer with an emotional or intriguing statement
-   - Family Overview: Introduce the scope and scale of the family
-   - Geographic Journey: Tell the story of migration and settlement
-   - Key Moments: Highlight 3-5 pivotal events or people
-   - Themes: Weave in the narrative themes naturally
-   - Legacy: Conclude with the family's lasting impact
-3. Use a warm, professional documentary tone (think Ken Burns style)
-4. Include specific dates, places, and names where provided
-5. Create emotional resonance without being overly sentimental
-6. Use vivid language that paints pictures
-7. Maintain historical accuracy while telling a compelling story
-
-Format your response as:
-[SEGMENT: Opening]
-[Duration: X seconds]
-[Text of opening segment]
-
-[SEGMENT: Family Overview]
-[Duration: X seconds]
-[Text of family overview segment]
-
-[Continue for all segments...]
-
-Remember: This is a treasured family keepsake. Make every word count."""
+{format_insights_for_prompt(insights)}"""
     
     return prompt
 
 
+def build_claude_messages(prompt: str) -> List[Dict[str, Any]]:
+    """Put the cacheable instructions ahead of the family-specific prompt"""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": NARRATION_INSTRUCTIONS,
+                    "cache_control": {"type": "ephemeral"}
+                },
+                {
+                    "type": "text",
+                    "text": prompt
+                }
+            ]
+        }
+    ]
+
+
 def format_journey_for_prompt(journey: List[Dict]) -> str:
     """Format geographic journey for prompt"""
     if not journey:
@@ -176,97 +252,299 @@ def format_insights_for_prompt(insights: Dict) -> str:
     return "\n".join(lines)
 
 
-async def generate_with_claude(prompt: str) -> str:
-    """Generate script using Claude"""
+def _script_cache_key(prompt: str) -> str:
+    # Hash everything that shapes the response so prompt edits miss the cache
+    digest = hashlib.blake2b(
+        f"{SCRIPT_MODEL}\n{NARRATION_INSTRUCTIONS}\n{prompt}".encode(),
+        digest_size=16
+    ).hexdigest()
+    return f"narration:{digest}"
+
+
+def _batch_script_key(project_id: int) -> str:
+    # Batch scripts are keyed by project: the prompt rebuilt from parsed_data
+    # after a JSONB round trip doesn't match the one that was submitted
+    return f"narration:project:{project_id}"
+
+
+async def get_cached_script(prompt: str, project_id: Optional[int] = None) -> Optional[str]:
+    """Return the project's batch script or a previous script for this prompt, if any"""
+    keys = [_script_cache_key(prompt)]
+    if project_id is not None:
+        keys.insert(0, _batch_script_key(project_id))
+    try:
+        cached = await asyncio.to_thread(redis_client.mget, keys)
+    except RedisError:
+        return None
+    return next((script.decode() for script in cached if script), None)
+
+
+async def cache_script(prompt: str, script_text: str) -> None:
+    """Store a generated script for reuse by identical prompts"""
+    try:
+        await asyncio.to_thread(
+            redis_client.setex, _script_cache_key(prompt), SCRIPT_CACHE_TTL, script_text
+        )
+    except RedisError:
+        pass
+
+
+async def enqueue_batch_narration(project_id: int, parsed_data: Dict[str, Any], title: str) -> None:
+    """Queue a project's script for the next Message Batch"""
+    request = orjson.dumps({
+        "project_id": project_id,
+        "prompt": build_narration_prompt(parsed_data, title)
+    })
+    await asyncio.to_thread(redis_client.rpush, NARRATION_BATCH_QUEUE, request)
+
+
+async def submit_narration_batch() -> Optional[str]:
+    """
+    Submit up to NARRATION_BATCH_SIZE queued scripts as one Message Batch
+    
+    Returns:
+        The batch id, or None if nothing was queued
+    """
+    queued = await asyncio.to_thread(redis_client.lpop, NARRATION_BATCH_QUEUE, NARRATION_BATCH_SIZE)
+    if not queued:
+        return None
     
-    response = await asyncio.get_event_loop().run_in_executor(
-        None,
-        lambda: anthropic_client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=2000,
-            temperature=0.7,
-            messages=[
+    # custom_id must be unique within a batch; a retried project may be queued twice
+    prompts = {}
+    for item in queued:
+        request = orjson.loads(item)
+        prompts[f"project-{request['project_id']}"] = request["prompt"]
+    
+    try:
+        batch = await anthropic_client.messages.batches.create(
+            requests=[
                 {
-                    "role": "user",
-                    "content": prompt
+                    "custom_id": custom_id,
+                    "params": {
+                        "model": SCRIPT_MODEL,
+                        "max_tokens": 2000,
+                        "temperature": 0.7,
+                        "messages": build_claude_messages(prompt)
+                    }
                 }
+                for custom_id, prompt in prompts.items()
             ]
         )
+    except Exception:
+        # Put the requests back at the front of the queue for the next run
+        await asyncio.to_thread(redis_client.lpush, NARRATION_BATCH_QUEUE, *reversed(queued))
+        raise
+    
+    pipe = redis_client.pipeline()
+    pipe.hset(f"narration:batch:{batch.id}", mapping=prompts)
+    pipe.sadd(NARRATION_BATCHES, batch.id)
+    await asyncio.to_thread(pipe.execute)
+    
+    return batch.id
+
+
+async def collect_narration_batches(resume: Callable[[int], Any]) -> List[int]:
+    """
+    Cache the scripts from every finished Message Batch under their project
+    
+    Failed, expired and cancelled requests are not cached, so those projects
+    fall back to generating their script directly when they resume.
+    
+    Args:
+        resume: Called with each project id before its batch is forgotten,
+            so a crash in between resumes the project twice, never zero times
+    
+    Returns:
+        Ids of the projects whose batch has finished
+    """
+    batch_ids = await asyncio.to_thread(redis_client.smembers, NARRATION_BATCHES)
+    project_ids = []
+    
+    for batch_id in (batch_id.decode() for batch_id in batch_ids):
+        batch = await anthropic_client.messages.batches.retrieve(batch_id)
+        if batch.processing_status != "ended":
+            continue
+        
+        prompts_key = f"narration:batch:{batch_id}"
+        prompts = {
+            custom_id.decode(): prompt.decode()
+            for custom_id, prompt in (await asyncio.to_thread(redis_client.hgetall, prompts_key)).items()
+        }
+        
+        scripts = {}
+        async for entry in await anthropic_client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded" and entry.custom_id in prompts:
+                project_id = int(entry.custom_id.removeprefix("project-"))
+                scripts[_batch_script_key(project_id)] = entry.result.message.content[0].text
+        
+        if scripts:
+            pipe = redis_client.pipeline()
+            for key, script_text in scripts.items():
+                pipe.setex(key, SCRIPT_CACHE_TTL, script_text)
+            await asyncio.to_thread(pipe.execute)
+        
+        batch_project_ids = [int(custom_id.removeprefix("project-")) for custom_id in prompts]
+        for project_id in batch_project_ids:
+            resume(project_id)
+        project_ids.extend(batch_project_ids)
+        
+        pipe = redis_client.pipeline()
+        pipe.delete(prompts_key)
+        pipe.srem(NARRATION_BATCHES, batch_id)
+        await asyncio.to_thread(pipe.execute)
+    
+    return project_ids
+
+
+async def generate_script_text(prompt: str) -> str:
+    """
+    Generate script text with Claude, hedged by GPT-4
+    
+    GPT-4 starts as soon as Claude fails, or alongside it once Claude has run
+    for SCRIPT_HEDGE_DELAY seconds. The first successful response wins and
+    the other request is cancelled.
+    """
+    claude_task = asyncio.create_task(generate_with_claude(prompt))
+    done, _ = await asyncio.wait({claude_task}, timeout=SCRIPT_HEDGE_DELAY)
+    
+    error = None
+    if done:
+        error = claude_task.exception()
+        if error is None:
+            return claude_task.result()
+        print(f"Claude generation failed: {error}, falling back to GPT-4")
+    
+    pending = {asyncio.create_task(generate_with_gpt4(prompt))}
+    if not done:
+        pending.add(claude_task)
+    
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def generate_with_claude(prompt: str) -> str:
+    """Generate script using Claude"""
+    
+    response = await anthropic_client.messages.create(
+        model=SCRIPT_MODEL,
+        max_tokens=2000,
+        temperature=0.7,
+        messages=build_claude_messages(prompt)
     )
     
     return response.content[0].text
 
 
+async def stream_with_claude(prompt: str) -> AsyncIterator[str]:
+    """Stream script text from Claude as it is generated"""
+    
+    async with anthropic_client.messages.stream(
+        model=SCRIPT_MODEL,
+        max_tokens=2000,
+        temperature=0.7,
+        messages=build_claude_messages(prompt)
+    ) as stream:
+        async for text in stream.text_stream:
+            yield text
+
+
 async def generate_with_gpt4(prompt: str) -> str:
     """Generate script using GPT-4"""
     
-    response = await asyncio.get_event_loop().run_in_executor(
-        None,
-        lambda: openai.ChatCompletion.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional documentary narrator specializing in family history documentaries."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
+    response = await openai_client.chat.completions.create(
+        model="gpt-4-turbo-preview",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a professional documentary narrator specializing in family history documentaries."
+            },
+            {
+                "role": "user",
+                "content": f"{NARRATION_INSTRUCTIONS}\n\n{prompt}"
+            }
+        ],
+        temperature=0.7,
+        max_tokens=2000
     )
     
     return response.choices[0].message.content
 
 
-def parse_script_response(script_text: str) -> Dict[str, Any]:
-    """Parse the AI-generated script into structured segments"""
+# One "[SEGMENT: title]" block, its optional "[Duration: N seconds]" line and
+# the text up to the next segment marker
+SEGMENT_PATTERN = re.compile(
+    r'\[SEGMENT:\s*([^\]]*)\]\s*(?:\[Duration:\s*(\d+)?[^\]]*\])?\s*(.*?)(?=\[SEGMENT:|\Z)',
+    re.DOTALL
+)
+
+
+def _segment_from_match(match: re.Match) -> Optional[Dict[str, Any]]:
+    text = ' '.join(match[3].split())
+    if not text:
+        return None
+    
+    title = match[1].strip()
+    return {
+        'type': title.lower().replace(' ', '_'),
+        'title': title,
+        'text': text,
+        'duration': int(match[2]) if match[2] else 10  # Default duration
+    }
+
+
+def split_segments(script_text: str) -> List[Dict[str, Any]]:
+    """Split "[SEGMENT: ...]" formatted script text into segments"""
+    return [
+        segment
+        for segment in map(_segment_from_match, SEGMENT_PATTERN.finditer(script_text))
+        if segment
+    ]
+
+
+class ScriptSegmenter:
+    """Split "[SEGMENT: ...]" formatted script text into segments as it arrives"""
     
-    segments = []
-    current_segment = None
-    full_text_parts = []
+    def __init__(self):
+        self.segments: List[Dict[str, Any]] = []
+        self._buffer = ''
     
-    lines = script_text.strip().split('\n')
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add script text and return any segments it completed"""
+        self._buffer += text
+        # Everything before the last segment marker is complete
+        last_marker = self._buffer.rfind('[SEGMENT:')
+        if last_marker <= 0:
+            return []
+        completed = split_segments(self._buffer[:last_marker])
+        self._buffer = self._buffer[last_marker:]
+        self.segments.extend(completed)
+        return completed
     
-    for line in lines:
-        line = line.strip()
-        
-        if line.startswith('[SEGMENT:'):
-            # Save previous segment if exists
-            if current_segment and current_segment.get('text'):
-                segments.append(current_segment)
-                full_text_parts.append(current_segment['text'])
-            
-            # Start new segment
-            segment_type = line.replace('[SEGMENT:', '').replace(']', '').strip()
-            current_segment = {
-                'type': segment_type.lower().replace(' ', '_'),
-                'title': segment_type,
-                'text': '',
-                'duration': 10  # Default duration
-            }
-        
-        elif line.startswith('[Duration:'):
-            if current_segment:
-                duration_str = line.replace('[Duration:', '').replace(']', '').strip()
-                try:
-                    current_segment['duration'] = int(duration_str.replace(' seconds', ''))
-                except:
-                    pass
-        
-        elif line and current_segment:
-            # Add to current segment text
-            if current_segment['text']:
-                current_segment['text'] += ' '
-            current_segment['text'] += line
+    def close(self) -> List[Dict[str, Any]]:
+        """Flush buffered text and return the final segment"""
+        completed = split_segments(self._buffer)
+        self._buffer = ''
+        self.segments.extend(completed)
+        return completed
+
+
+def parse_script_response(script_text: str) -> Dict[str, Any]:
+    """Parse the AI-generated script into structured segments"""
     
-    # Add final segment
-    if current_segment and current_segment.get('text'):
-        segments.append(current_segment)
-        full_text_parts.append(current_segment['text'])
+    return structure_segments(split_segments(script_text), script_text)
+
+
+def structure_segments(segments: List[Dict[str, Any]], script_text: str) -> Dict[str, Any]:
+    """Build the structured script from parsed segments"""
     
     # If no segments found, treat entire text as one segment
     if not segments:
@@ -276,11 +554,10 @@ def parse_script_response(script_text: str) -> Dict[str, Any]:
             'text': script_text,
             'duration': len(script_text.split()) // 2  # Rough estimate
         }]
-        full_text_parts = [script_text]
     
     return {
         'segments': segments,
-        'full_text': '\n\n'.join(full_text_parts),
+        'full_text': '\n\n'.join(segment['text'] for segment in segments),
         'estimated_duration': sum(seg['duration'] for seg in segments)
     }
 
@@ -310,65 +587,232 @@ def select_narrator_voice(parsed_data: Dict[str, Any], script_data: Dict[str, An
         return voices["documentary_female"]
 
 
-async def generate_voice_over(script: str, voice_id: str) -> Dict[str, Any]:
+async def generate_voice_over(segments: List[Dict[str, Any]], voice_id: str) -> Dict[str, Any]:
     """
     Generate voice-over audio using ElevenLabs
+    
+    Segments are synthesized in parallel as raw PCM, each streamed to its
+    own file as it arrives, then written into one WAV file with the wave
+    module; the video encoder compresses it to AAC exactly once.
     """
+    script = " ".join(segment['text'] for segment in segments)
     
     try:
-        # Generate audio
-        audio = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: generate(
-                text=script,
-                voice=voice_id,
-                model="eleven_monolingual_v1"
-            )
-        )
+        semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
         
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-            save(audio, temp_file.name)
-            temp_path = temp_file.name
+        with tempfile.TemporaryDirectory() as temp_dir:
+            segment_paths = [
+                os.path.join(temp_dir, f"seg_{i}.pcm") for i in range(len(segments))
+            ]
+            segment_sizes = await asyncio.gather(*(
+                synthesize_segment(semaphore, segment['text'], voice_id, path)
+                for segment, path in zip(segments, segment_paths)
+            ))
+            return await publish_voice_over(
+                segment_paths, segment_sizes, script, voice_id, temp_dir
+            )
         
-        # Upload to S3
-        audio_filename = f"narration/{uuid.uuid4()}.mp3"
-        audio_url = await upload_file_to_s3(
-            file_path=temp_path,
-            s3_key=audio_filename,
-            content_type="audio/mpeg"
+    except Exception as e:
+        print(f"Error generating voice-over: {str(e)}")
+        # Fallback to mock data for development
+        return await generate_mock_voice_over(segments, voice_id)
+
+
+async def generate_narration_with_voice_over(
+    parsed_data: Dict[str, Any],
+    title: str,
+    project_id: Optional[int] = None,
+    script_ready: Optional[asyncio.Future] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Generate the narration script and its voice-over as one pipeline
+    
+    Claude's response is streamed and each segment goes to TTS as soon as
+    its text is complete, so synthesis overlaps generation instead of
+    waiting for the whole script. Falls back to the staged path, where
+    GPT-4 is raced against Claude, if the stream fails, is slower than
+    SCRIPT_HEDGE_DELAY to start or runs past SCRIPT_STREAM_TIMEOUT.
+    
+    Args:
+        project_id: Project whose Message Batch script, if any, is used
+        script_ready: Resolved with the narration script as soon as it is
+            complete, while the voice-over may still be synthesizing
+    
+    Returns:
+        Tuple of (narration script, voice-over) in the same shapes as
+        generate_narration_script and generate_voice_over
+    """
+    def publish_script(narration_script: Dict[str, Any]) -> None:
+        if script_ready is not None and not script_ready.done():
+            script_ready.set_result(narration_script)
+    
+    prompt = build_narration_prompt(parsed_data, title)
+    
+    # Nothing to stream when the script is already cached
+    if await get_cached_script(prompt, project_id) is not None:
+        narration_script = await generate_narration_script(parsed_data, title, project_id)
+        publish_script(narration_script)
+        voice_over = await generate_voice_over(
+            narration_script['segments'], narration_script['voice_id']
         )
+        return narration_script, voice_over
+    
+    voice_id = select_narrator_voice(parsed_data, {})
+    semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+    segmenter = ScriptSegmenter()
+    script_parts = []
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        segment_paths = []
+        tts_tasks = []
         
-        # Clean up temp file
-        os.unlink(temp_path)
+        def start_tts(segment: Dict[str, Any]) -> None:
+            path = os.path.join(temp_dir, f"seg_{len(segment_paths)}.pcm")
+            segment_paths.append(path)
+            tts_tasks.append(asyncio.create_task(
+                synthesize_segment(semaphore, segment['text'], voice_id, path)
+            ))
         
-        # Calculate duration (approximate based on word count)
-        word_count = len(script.split())
-        duration = int((word_count / 150) * 60)  # 150 words per minute average
+        stream = stream_with_claude(prompt)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SCRIPT_STREAM_TIMEOUT
+        try:
+            timeout = SCRIPT_HEDGE_DELAY
+            while True:
+                try:
+                    text = await asyncio.wait_for(stream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                script_parts.append(text)
+                for segment in segmenter.feed(text):
+                    start_tts(segment)
+                timeout = deadline - loop.time()
+            for segment in segmenter.close():
+                start_tts(segment)
+        except Exception as e:
+            await stream.aclose()
+            await cancel_tasks(tts_tasks)
+            print(f"Claude streaming failed: {e!r}, falling back to staged generation")
+            narration_script = await generate_narration_script(parsed_data, title, project_id)
+            publish_script(narration_script)
+            voice_over = await generate_voice_over(
+                narration_script['segments'], narration_script['voice_id']
+            )
+            return narration_script, voice_over
         
-        return {
-            "audio_url": audio_url,
-            "duration": duration,
-            "word_count": word_count,
-            "voice_id": voice_id
+        script_text = ''.join(script_parts)
+        await cache_script(prompt, script_text)
+        structured_script = structure_segments(segmenter.segments, script_text)
+        narration_script = {
+            "script": structured_script["full_text"],
+            "segments": structured_script["segments"],
+            "full_text": structured_script["full_text"],
+            "voice_id": voice_id,
+            "total_duration": structured_script["estimated_duration"]
         }
+        publish_script(narration_script)
         
-    except Exception as e:
-        print(f"Error generating voice-over: {str(e)}")
-        # Fallback to mock data for development
-        return await generate_mock_voice_over(script, voice_id)
+        # Unsegmented responses become one segment that hasn't been voiced yet
+        if not tts_tasks:
+            start_tts(structured_script["segments"][0])
+        
+        try:
+            segment_sizes = await asyncio.gather(*tts_tasks)
+            voice_over = await publish_voice_over(
+                segment_paths, segment_sizes, narration_script["script"], voice_id, temp_dir
+            )
+        except Exception as e:
+            await cancel_tasks(tts_tasks)
+            print(f"Error generating voice-over: {str(e)}")
+            voice_over = await generate_mock_voice_over(narration_script["segments"], voice_id)
+    
+    return narration_script, voice_over
+
+
+async def cancel_tasks(tasks: List[asyncio.Task]) -> None:
+    """Cancel tasks and wait for them to unwind"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def publish_voice_over(
+    segment_paths: List[str],
+    segment_sizes: List[int],
+    script: str,
+    voice_id: str,
+    temp_dir: str
+) -> Dict[str, Any]:
+    """Join synthesized segments, upload the narration and describe it"""
+    audio_path = os.path.join(temp_dir, "narration.wav")
+    await asyncio.to_thread(write_wav, segment_paths, audio_path)
+    
+    # Upload to S3
+    audio_filename = f"narration/{uuid.uuid4()}.wav"
+    audio_url = await upload_file_to_s3(
+        file_path=audio_path,
+        s3_key=audio_filename,
+        content_type="audio/wav"
+    )
+    
+    segment_durations = [
+        size / (TTS_SAMPLE_RATE * TTS_SAMPLE_WIDTH) for size in segment_sizes
+    ]
+    
+    return {
+        "audio_url": audio_url,
+        "duration": int(sum(segment_durations)),
+        "segment_durations": segment_durations,
+        "word_count": len(script.split()),
+        "voice_id": voice_id
+    }
 
 
-async def generate_mock_voice_over(script: str, voice_id: str) -> Dict[str, Any]:
+async def synthesize_segment(
+    semaphore: asyncio.Semaphore,
+    text: str,
+    voice_id: str,
+    output_path: str
+) -> int:
+    """Stream one segment's audio to disk and return its size in bytes"""
+    audio_size = 0
+    async with semaphore:
+        async with aiofiles.open(output_path, 'wb') as out:
+            async for chunk in elevenlabs_client.text_to_speech.convert_as_stream(
+                voice_id=voice_id,
+                text=text,
+                model_id=TTS_MODEL_ID,
+                output_format=TTS_OUTPUT_FORMAT
+            ):
+                audio_size += len(chunk)
+                await out.write(chunk)
+    return audio_size
+
+
+def write_wav(segment_paths: List[str], output_path: str) -> None:
+    """Join raw PCM segments into one WAV file"""
+    with wave.open(output_path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(TTS_SAMPLE_WIDTH)
+        wav.setframerate(TTS_SAMPLE_RATE)
+        for path in segment_paths:
+            with open(path, 'rb') as segment:
+                while chunk := segment.read(1024 * 1024):
+                    wav.writeframesraw(chunk)
+
+
+async def generate_mock_voice_over(segments: List[Dict[str, Any]], voice_id: str) -> Dict[str, Any]:
     """Generate mock voice-over data for development"""
     
-    word_count = len(script.split())
-    duration = int((word_count / 150) * 60)
+    # Roughly 150 words per minute
+    word_counts = [len(segment['text'].split()) for segment in segments]
+    segment_durations = [count / 150 * 60 for count in word_counts]
     
     return {
         "audio_url": f"https://{settings.S3_BUCKET_NAME}.s3.amazonaws.com/mock/narration.mp3",
-        "duration": duration,
-        "word_count": word_count,
+        "duration": int(sum(segment_durations)),
+        "segment_durations": segment_durations,
+        "word_count": sum(word_counts),
         "voice_id": voice_id
     }
 
@@ -12,27 +12,42 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
 
 from gedcom_parser import GEDCOMParser, StoryGenerator
 
+from app.utils.s3 import read_file_from_s3
 
-async def process_gedcom_file(gedcom_content: str) -> Dict[str, Any]:
+# Major historical events by period: (start year, end year, name)
+_HISTORICAL_EVENTS = (
+    (1776, 1783, "American Revolution"),
+    (1861, 1865, "American Civil War"),
+    (1914, 1918, "World War I"),
+    (1929, 1939, "Great Depression"),
+    (1939, 1945, "World War II"),
+    (1845, 1852, "Irish Potato Famine"),
+    (1849, 1855, "California Gold Rush"),
+    (1892, 1954, "Ellis Island Immigration"),
+)
+
+
+async def process_gedcom_file(gedcom_s3_key: str) -> Dict[str, Any]:
     """
-    Process GEDCOM file content and extract story data
+    Process a GEDCOM file stored in S3 and extract story data
+    
+    The object is not streamed: it is read whole into memory with
+    concurrent ranged GETs, decoded, and parsed from there instead of
+    round-tripping through a temporary file. Uploads are capped at
+    MAX_UPLOAD_SIZE, which bounds the memory this takes.
     
     Args:
-        gedcom_content: The raw GEDCOM file content as a string
+        gedcom_s3_key: S3 key of the uploaded GEDCOM file
         
     Returns:
         Dictionary containing parsed data and narrative elements
     """
     try:
-        # Save content to temporary file for parser
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.ged', delete=False) as temp_file:
-            temp_file.write(gedcom_content)
-            temp_file_path = temp_file.name
+        gedcom_content = await read_file_from_s3(gedcom_s3_key)
         
-        # Parse the GEDCOM file
+        # Parse the GEDCOM file; utf-8-sig drops a leading BOM
         parser = GEDCOMParser()
-        story_data = parser.parse_file(temp_file_path)
+        story_data = parser.parse_string(gedcom_content.decode('utf-8-sig'))
         
         # Generate opening narrative
         generator = StoryGenerator(story_data)
@@ -41,9 +56,6 @@ async def process_gedcom_file(gedcom_content: str) -> Dict[str, Any]:
         # Add the opening narrative to the story data
         story_data['opening_narrative'] = opening_narrative
         
-        # Clean up temporary file
-        os.unlink(temp_file_path)
-        
         # Enhance the data with additional insights
         story_data['insights'] = generate_insights(story_data)
         
@@ -102,10 +114,10 @@ def calculate_migration_span(journey: list) -> str:
     """
     Calculate the geographic span of migration
     """
-    locations = [j['location'] for j in journey]
-    if len(set(locations)) > 3:
+    distinct_locations = len({j['location'] for j in journey})
+    if distinct_locations > 3:
         return "extensive - across multiple regions"
-    elif len(set(locations)) > 1:
+    elif distinct_locations > 1:
         return "moderate - within a general region"
     else:
         return "minimal - largely settled in one area"
@@ -133,22 +145,8 @@ def get_historical_context(earliest_year: int, latest_year: int) -> list:
     """
     Get relevant historical events for the time period
     """
-    events = []
-    
-    # Major historical events by period
-    historical_events = [
-        (1776, 1783, "American Revolution"),
-        (1861, 1865, "American Civil War"),
-        (1914, 1918, "World War I"),
-        (1929, 1939, "Great Depression"),
-        (1939, 1945, "World War II"),
-        (1845, 1852, "Irish Potato Famine"),
-        (1849, 1855, "California Gold Rush"),
-        (1892, 1954, "Ellis Island Immigration"),
+    return [
+        event
+        for start, end, event in _HISTORICAL_EVENTS
+        if start <= latest_year and end >= earliest_year
     ]
-    
-    for start, end, event in historical_events:
-        if start <= latest_year and end >= earliest_year:
-            events.append(event)
-    
-    return events
@@ -4,170 +4,221 @@ Combines audio narration, visual scenes, and effects into final documentary
 """
 
 import asyncio
+import hashlib
 import os
+import re
+import signal
 import tempfile
 import uuid
-from typing import Dict, Any, List
-import subprocess
-import json
+from typing import AsyncIterator, Awaitable, Dict, Any, List, Tuple
+
+import orjson
 
 from app.core.config import settings
-from app.utils.s3 import upload_file_to_s3, download_file_from_s3
+from app.utils.s3 import (
+    delete_file_from_s3,
+    download_cached_file_from_s3,
+    download_file_from_s3,
+    evict_asset_cache,
+    link_or_copy_file,
+    upload_stream_to_s3
+)
+
+# Encoder settings tried in order; each is used only if a test encode succeeds
+VAAPI_DEVICE = "/dev/dri/renderD128"
+VIDEO_ENCODERS = {
+    "h264_nvenc": {
+        "input_args": [],
+        "filter": "format=yuv420p",
+        "output_args": [
+            "-c:v", "h264_nvenc",
+            "-preset", "p5",
+            "-tune", "hq",
+            "-rc", "vbr",
+            "-cq", "23",
+            "-b:v", "6M"
+        ]
+    },
+    "h264_vaapi": {
+        "input_args": ["-vaapi_device", VAAPI_DEVICE],
+        "filter": "format=nv12,hwupload",
+        "output_args": [
+            "-c:v", "h264_vaapi",
+            "-qp", "23"
+        ]
+    },
+    "libx264": {
+        "input_args": [],
+        "filter": "format=yuv420p",
+        "output_args": [
+            "-c:v", "libx264",
+            "-preset", "medium",
+            "-crf", "23"
+        ]
+    }
+}
+
+_video_encoder = None
+
+# Scene assets fetched from S3 at once
+ASSET_DOWNLOAD_CONCURRENCY = 16
+
+# Scene clips rendered at once; each encoder already uses several threads
+SCENE_RENDER_CONCURRENCY = 4
+
+# ffmpeg -progress reports the encoded position in microseconds
+_PROGRESS_TIME_RE = re.compile(rb"^out_time_(?:us|ms)=(\d+)$", re.MULTILINE)
 
 
 async def assemble_final_video(
-    voice_over_url: str,
-    visual_scenes: List[Dict[str, Any]],
-    project_title: str,
-    duration: int
+    voice_over: Awaitable[Dict[str, Any]],
+    visual_scenes: AsyncIterator[Tuple[int, Dict[str, Any]]],
+    project_title: str
 ) -> Dict[str, Any]:
     """
     Assemble the final documentary video
     
+    Each scene is downloaded and rendered to a clip as soon as it arrives,
+    while the voice-over is still being generated; only the final mux
+    waits for the audio.
+    
+    Args:
+        voice_over: Resolves to the voice-over's audio_url and duration
+        visual_scenes: Yields (index, scene) pairs in any order
+        project_title: Documentary title
+    
     Returns:
-        Dictionary containing video_url and duration
+        Dictionary containing video_url, duration and the scenes in order
     """
     
     # Create temporary directory for processing
     with tempfile.TemporaryDirectory() as temp_dir:
+        scenes = {}
+        clips = {}
         try:
-            # Download voice-over audio
-            audio_path = os.path.join(temp_dir, "narration.mp3")
-            await download_file_from_s3(voice_over_url, audio_path)
+            encoder = await get_video_encoder()
+            timeline_config = {
+                "resolution": settings.VIDEO_RESOLUTION,
+                "fps": settings.VIDEO_FPS
+            }
+            download_semaphore = asyncio.Semaphore(ASSET_DOWNLOAD_CONCURRENCY)
+            render_semaphore = asyncio.Semaphore(SCENE_RENDER_CONCURRENCY)
             
-            # Download visual assets
-            visual_paths = await download_visual_assets(visual_scenes, temp_dir)
+            async for i, scene in visual_scenes:
+                scenes[i] = scene
+                if scene.get("url"):
+                    clips[i] = asyncio.create_task(prepare_scene_clip(
+                        download_semaphore, render_semaphore, i, scene,
+                        temp_dir, timeline_config, encoder
+                    ))
             
-            # Create video timeline configuration
-            timeline_config = create_timeline_config(
-                visual_scenes=visual_scenes,
-                visual_paths=visual_paths,
-                audio_duration=duration
+            # Download voice-over audio once it is ready
+            voice_over_data = await voice_over
+            audio_path = os.path.join(
+                temp_dir, f"narration.{get_file_extension(voice_over_data['audio_url'])}"
             )
+            await download_file_from_s3(voice_over_data['audio_url'], audio_path)
             
-            # Generate video using FFmpeg
-            output_path = os.path.join(temp_dir, "documentary.mp4")
-            await generate_video_ffmpeg(
-                timeline_config=timeline_config,
-                audio_path=audio_path,
-                output_path=output_path,
-                title=project_title
-            )
+            clip_paths = await asyncio.gather(*(clips[i] for i in sorted(clips)))
             
-            # Upload final video to S3
+            # Generate video using FFmpeg, uploading it to S3 as it is encoded
             video_filename = f"documentaries/{uuid.uuid4()}.mp4"
-            video_url = await upload_file_to_s3(
-                file_path=output_path,
+            video_data = await generate_video_ffmpeg(
+                clip_paths=clip_paths,
+                audio_path=audio_path,
                 s3_key=video_filename,
-                content_type="video/mp4"
+                title=project_title,
+                work_dir=temp_dir,
+                duration=voice_over_data['duration']
             )
-            
-            # Get actual video duration
-            actual_duration = get_video_duration(output_path)
-            
-            return {
-                "video_url": video_url,
-                "duration": actual_duration
-            }
-            
+            video_data["scenes"] = [scenes[i] for i in sorted(scenes)]
+            return video_data
+        
         except Exception as e:
             print(f"Error assembling video: {str(e)}")
             raise
+        finally:
+            # Stop clip renders before their directory is removed
+            for task in clips.values():
+                task.cancel()
+            await asyncio.gather(*clips.values(), return_exceptions=True)
 
 
-async def download_visual_assets(scenes: List[Dict], temp_dir: str) -> Dict[str, str]:
-    """Download all visual assets to temporary directory"""
-    visual_paths = {}
-    
-    for i, scene in enumerate(scenes):
-        if scene.get("url"):
-            extension = get_file_extension(scene["url"])
-            filename = f"scene_{i}.{extension}"
-            local_path = os.path.join(temp_dir, filename)
-            
-            # Download file
-            await download_file_from_s3(scene["url"], local_path)
-            visual_paths[i] = local_path
-    
-    return visual_paths
-
-
-def create_timeline_config(
-    visual_scenes: List[Dict],
-    visual_paths: Dict[int, str],
-    audio_duration: int
-) -> Dict[str, Any]:
-    """Create timeline configuration for video assembly"""
-    
-    timeline = {
-        "duration": audio_duration,
-        "resolution": settings.VIDEO_RESOLUTION,
-        "fps": settings.VIDEO_FPS,
-        "scenes": []
+async def prepare_scene_clip(
+    download_semaphore: asyncio.Semaphore,
+    render_semaphore: asyncio.Semaphore,
+    index: int,
+    scene: Dict[str, Any],
+    temp_dir: str,
+    timeline_config: Dict,
+    encoder: Dict[str, Any]
+) -> str:
+    """Download a scene's asset and render it to a clip, returning the clip path"""
+    extension = get_file_extension(scene["url"])
+    local_path = os.path.join(temp_dir, f"scene_{index}.{extension}")
+    
+    # Download file; scene assets are often shared between projects
+    async with download_semaphore:
+        await download_cached_file_from_s3(scene["url"], local_path)
+    
+    scene_config = {
+        "index": index,
+        "path": local_path,
+        "duration": scene.get("duration", 10),
+        "effects": scene.get("effects", []),
+        "type": scene.get("type", "image")
     }
-    
-    current_time = 0
-    
-    for i, scene in enumerate(visual_scenes):
-        scene_duration = scene.get("duration", 10)
-        
-        scene_config = {
-            "index": i,
-            "path": visual_paths.get(i),
-            "start_time": current_time,
-            "duration": scene_duration,
-            "effects": scene.get("effects", []),
-            "type": scene.get("type", "image")
-        }
-        
-        timeline["scenes"].append(scene_config)
-        current_time += scene_duration
-    
-    return timeline
+    clip_path = os.path.join(temp_dir, f"clip_{index}.mp4")
+    await render_scene_clip(render_semaphore, scene_config, clip_path, timeline_config, encoder)
+    return clip_path
 
 
 async def generate_video_ffmpeg(
-    timeline_config: Dict,
+    clip_paths: List[str],
     audio_path: str,
-    output_path: str,
-    title: str
-) -> None:
-    """Generate video using FFmpeg"""
+    s3_key: str,
+    title: str,
+    work_dir: str,
+    duration: int
+) -> Dict[str, Any]:
+    """
+    Generate video using FFmpeg and stream it straight to S3
     
-    # Create filter complex for all scenes
-    filter_complex = build_filter_complex(timeline_config)
+    The scene clips share identical encoder settings, so the concat demuxer
+    joins them without re-encoding while the audio is muxed in. The MP4 is
+    fragmented so it can be written to a pipe; its parts are uploaded while
+    the final pass is still running.
+    
+    Returns:
+        Dictionary containing video_url and duration
+    """
+    
+    concat_list_path = os.path.join(work_dir, "clips.txt")
+    with open(concat_list_path, "w") as concat_list:
+        concat_list.writelines(f"file '{path}'\n" for path in clip_paths)
     
     # Build FFmpeg command
     cmd = [
         "ffmpeg",
         "-y",  # Overwrite output
+        "-f", "concat",
+        "-safe", "0",
+        "-i", concat_list_path,
+        "-i", audio_path,
+        "-map", "0:v",
+        "-map", "1:a",
     ]
     
-    # Add input files
-    for scene in timeline_config["scenes"]:
-        if scene["path"]:
-            cmd.extend(["-i", scene["path"]])
-    
-    # Add audio
-    cmd.extend(["-i", audio_path])
-    
-    # Add filter complex
-    cmd.extend([
-        "-filter_complex", filter_complex,
-        "-map", "[outv]",
-        "-map", f"{len(timeline_config['scenes'])}:a",  # Audio input index
-    ])
-    
     # Output settings
     cmd.extend([
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "23",
+        "-c:v", "copy",
         "-c:a", "aac",
         "-b:a", "192k",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
-        output_path
+        "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+        "-f", "mp4",
+        "-progress", "pipe:2",
+        "-nostats",
+        "pipe:1"
     ])
     
     # Run FFmpeg
@@ -177,51 +228,177 @@ async def generate_video_ffmpeg(
         stderr=asyncio.subprocess.PIPE
     )
     
-    stdout, stderr = await process.communicate()
+    upload = asyncio.create_task(
+        upload_stream_to_s3(process.stdout, s3_key, content_type="video/mp4")
+    )
+    
+    # Nothing reads stdout once the upload fails, so stop ffmpeg writing to it
+    def stop_on_upload_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() and process.returncode is None:
+            process.kill()
+    
+    upload.add_done_callback(stop_on_upload_failure)
+    
+    # Drain stderr alongside the upload so a full pipe can't stall ffmpeg
+    stderr = await process.stderr.read()
+    await process.wait()
+    
+    try:
+        video_url = await upload
+    except Exception:
+        # An ffmpeg error takes precedence over the truncated upload it caused
+        if process.returncode in (0, -signal.SIGKILL):
+            raise
+        video_url = None
     
     if process.returncode != 0:
+        if video_url:
+            await asyncio.to_thread(delete_file_from_s3, s3_key)
         raise Exception(f"FFmpeg failed: {stderr.decode()}")
+    
+    # Final progress report gives the encoded duration without an ffprobe pass
+    times = _PROGRESS_TIME_RE.findall(stderr)
+    if times:
+        duration = round(int(times[-1]) / 1_000_000)
+    
+    return {
+        "video_url": video_url,
+        "duration": duration
+    }
+
 
+async def get_video_encoder() -> Dict[str, Any]:
+    """
+    Pick the fastest H.264 encoder that works on this machine
+    
+    Hardware encoders can be compiled into ffmpeg without a usable GPU, so
+    each candidate is proven with a tiny test encode. The result is cached
+    for the life of the process.
+    """
+    global _video_encoder
+    if _video_encoder is not None:
+        return _video_encoder
+    
+    for name, encoder in VIDEO_ENCODERS.items():
+        if name == "libx264" or await probe_video_encoder(encoder):
+            print(f"Using {name} for video encoding")
+            _video_encoder = encoder
+            break
+    
+    return _video_encoder
 
-def build_filter_complex(timeline_config: Dict) -> str:
-    """Build FFmpeg filter complex string"""
+
+async def probe_video_encoder(encoder: Dict[str, Any]) -> bool:
+    """Check an encoder can produce a few frames"""
+    if "-vaapi_device" in encoder["input_args"] and not os.path.exists(VAAPI_DEVICE):
+        return False
+    
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-hide_banner",
+        *encoder["input_args"],
+        "-f", "lavfi", "-i", "color=size=256x256:duration=0.2",
+        "-vf", encoder["filter"],
+        *encoder["output_args"],
+        "-f", "null", "-",
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    return await process.wait() == 0
+
+
+async def render_scene_clip(
+    semaphore: asyncio.Semaphore,
+    scene: Dict,
+    output_path: str,
+    timeline_config: Dict,
+    encoder: Dict[str, Any]
+) -> None:
+    """Render one scene to a clip at the timeline's resolution and frame rate"""
+    
+    scene_filter = build_scene_filter(scene, timeline_config)
+    
+    output_args = [
+        "-vf", f"{scene_filter},{encoder['filter']}",
+        "-an",
+        "-r", str(timeline_config["fps"]),
+        *encoder["output_args"]
+    ]
+    
+    # Clips are cached by input content and render settings, so retries and
+    # repeated stock footage skip the encode
+    clip_key = await asyncio.to_thread(scene_clip_cache_key, scene["path"], output_args)
+    cache_path = os.path.join(settings.ASSET_CACHE_DIR, f"clip-{clip_key}.mp4")
+    try:
+        os.utime(cache_path)
+        await asyncio.to_thread(link_or_copy_file, cache_path, output_path)
+        return
+    except OSError:
+        pass
     
-    filters = []
-    concat_inputs = []
+    cmd = [
+        "ffmpeg",
+        "-y",
+        *encoder["input_args"],
+        "-i", scene["path"],
+        *output_args,
+        output_path
+    ]
+    
+    async with semaphore:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        
+        stdout, stderr = await process.communicate()
+    
+    if process.returncode != 0:
+        raise Exception(f"FFmpeg failed on scene {scene['index']}: {stderr.decode()}")
+    
+    try:
+        os.makedirs(settings.ASSET_CACHE_DIR, exist_ok=True)
+        await asyncio.to_thread(link_or_copy_file, output_path, cache_path)
+    except OSError:
+        return
+    await asyncio.to_thread(evict_asset_cache)
+
+
+def scene_clip_cache_key(input_path: str, output_args: List[str]) -> str:
+    """Hash a scene's input file together with the arguments it is rendered with"""
+    digest = hashlib.blake2b(orjson.dumps(output_args), digest_size=16)
+    with open(input_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_scene_filter(scene: Dict, timeline_config: Dict) -> str:
+    """Build the FFmpeg filter chain for one scene"""
     
     resolution = timeline_config["resolution"]
     width, height = resolution.split("x")
     
-    for i, scene in enumerate(timeline_config["scenes"]):
-        input_label = f"[{i}:v]"
-        output_label = f"[v{i}]"
-        
-        scene_filters = []
-        
-        # Scale to output resolution
-        scene_filters.append(f"scale={width}:{height}:force_original_aspect_ratio=decrease")
-        scene_filters.append(f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2")
-        
-        # Apply effects
-        for effect in scene.get("effects", []):
-            effect_filter = get_effect_filter(effect, scene["duration"])
-            if effect_filter:
-                scene_filters.append(effect_filter)
-        
-        # Set duration
-        scene_filters.append(f"setpts=PTS-STARTPTS")
-        scene_filters.append(f"trim=duration={scene['duration']}")
-        
-        # Build filter chain for this scene
-        filter_chain = f"{input_label}{','.join(scene_filters)}{output_label}"
-        filters.append(filter_chain)
-        concat_inputs.append(output_label)
+    scene_filters = []
     
-    # Concatenate all scenes
-    concat_filter = f"{''.join(concat_inputs)}concat=n={len(concat_inputs)}:v=1:a=0[outv]"
-    filters.append(concat_filter)
+    # Scale to output resolution
+    scene_filters.append(f"scale={width}:{height}:force_original_aspect_ratio=decrease")
+    scene_filters.append(f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2")
+    scene_filters.append("setsar=1")
     
-    return ";".join(filters)
+    # Apply effects
+    for effect in scene.get("effects", []):
+        effect_filter = get_effect_filter(effect, scene["duration"])
+        if effect_filter:
+            scene_filters.append(effect_filter)
+    
+    # Set duration, holding the last frame of stills and short footage
+    scene_filters.append(f"setpts=PTS-STARTPTS")
+    scene_filters.append(f"fps={timeline_config['fps']}")
+    scene_filters.append(f"tpad=stop_mode=clone:stop_duration={scene['duration']}")
+    scene_filters.append(f"trim=duration={scene['duration']}")
+    
+    return ",".join(scene_filters)
 
 
 def get_effect_filter(effect: str, duration: float) -> str:
@@ -242,24 +419,6 @@ def get_effect_filter(effect: str, duration: float) -> str:
     return effect_filters.get(effect, "")
 
 
-def get_video_duration(video_path: str) -> int:
-    """Get actual duration of video file"""
-    cmd = [
-        "ffprobe",
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        video_path
-    ]
-    
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode == 0:
-        return int(float(result.stdout.strip()))
-    
-    return 0
-
-
 def get_file_extension(url: str) -> str:
     """Extract file extension from URL"""
     path = url.split("?")[0]  # Remove query parameters
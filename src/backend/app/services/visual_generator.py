@@ -4,16 +4,73 @@ Generates or selects appropriate visuals for each segment of the documentary
 """
 
 import asyncio
-import json
-from typing import Dict, Any, List
-import random
+import bisect
+import hashlib
+import re
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+import zlib
 from datetime import datetime
 
+import orjson
+from redis.exceptions import RedisError
+
 from app.core.config import settings
-from app.services.stock_footage import get_stock_footage
-from app.services.ai_image_generator import generate_ai_images
+from app.db.cache import redis_client
 from app.utils.s3 import upload_file_to_s3
 
+# Time periods by earliest year; each cutoff is the first year of the next period
+_PERIOD_CUTOFFS = (1800, 1850, 1900, 1950, 2000)
+_PERIOD_LABELS = ("colonial", "early_1800s", "late_1800s", "early_1900s", "mid_1900s", "modern")
+
+# Location keywords for each ethnic background, matched in a single pass
+_ETHNIC_KEYWORDS = {
+    "irish": ["ireland", "irish"],
+    "german": ["germany", "german", "bavaria"],
+    "italian": ["italy", "italian"],
+    "british": ["england", "english", "britain"],
+    "scottish": ["scotland", "scottish"],
+    "polish": ["poland", "polish"],
+    "mexican": ["mexico", "mexican"],
+    "chinese": ["china", "chinese"],
+    "african": ["africa", "african"]
+}
+_ETHNIC_RE = re.compile(
+    "|".join(f"(?P<{background}>{'|'.join(keywords)})" for background, keywords in _ETHNIC_KEYWORDS.items()),
+    re.IGNORECASE
+)
+
+# Stock footage search tags for each narrative theme
+_THEME_VISUALS = {
+    "immigration": ["ship", "ellis island", "voyage", "new land"],
+    "military_service": ["uniform", "flag", "medals", "service"],
+    "large_family": ["gathering", "reunion", "children", "generations"],
+    "farming": ["farmland", "harvest", "rural", "agriculture"],
+    "urban": ["city", "industry", "streets", "buildings"]
+}
+
+# Image generation style for each time period
+_PERIOD_STYLES = {
+    "colonial": "colonial era painting style, 1700s aesthetic",
+    "early_1800s": "19th century daguerreotype style, sepia toned",
+    "late_1800s": "Victorian era photography, vintage portrait",
+    "early_1900s": "early 20th century photograph, slightly faded",
+    "mid_1900s": "mid-century photograph, color but nostalgic",
+    "modern": "contemporary but timeless photographic style"
+}
+
+# Segments whose visuals are fetched at once from the stock and image APIs
+SCENE_GENERATION_CONCURRENCY = 8
+
+# Stock footage results are shared between documentaries for a day
+STOCK_FOOTAGE_CACHE_TTL = 86400
+
+# Requests in flight to each external API across all jobs in this process,
+# kept under their rate limits
+STOCK_FOOTAGE_CONCURRENCY = 8
+AI_IMAGE_CONCURRENCY = 4
+_stock_footage_semaphore = asyncio.Semaphore(STOCK_FOOTAGE_CONCURRENCY)
+_ai_image_semaphore = asyncio.Semaphore(AI_IMAGE_CONCURRENCY)
+
 
 async def generate_visual_scenes(
     parsed_data: Dict[str, Any],
@@ -25,25 +82,58 @@ async def generate_visual_scenes(
     Returns:
         List of visual scene dictionaries with urls and metadata
     """
-    visual_scenes = []
+    visual_scenes = [None] * len(script_segments)
+    async for i, scene in stream_visual_scenes(parsed_data, script_segments):
+        visual_scenes[i] = scene
     
+    return visual_scenes
+
+
+async def stream_visual_scenes(
+    parsed_data: Dict[str, Any],
+    script_segments: List[Dict[str, Any]]
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Generate visual scenes for each script segment as they complete
+    
+    Yields:
+        (segment index, visual scene) pairs in completion order
+    """
     # Extract context from parsed data
     context = extract_visual_context(parsed_data)
     
-    for segment in script_segments:
-        scene = await generate_scene_for_segment(segment, context)
-        visual_scenes.append(scene)
+    # Look up stock footage for every segment in a single request
+    queries = [build_stock_query(segment, context) for segment in script_segments]
+    batch = [query for query in queries if query is not None]
+    results = iter(await get_cached_stock_footage(batch) if batch else [])
+    stock_results = [next(results) if query is not None else None for query in queries]
     
-    return visual_scenes
+    # Segments are independent and only read the context, so fetch them together
+    semaphore = asyncio.Semaphore(SCENE_GENERATION_CONCURRENCY)
+    
+    async def generate(i: int, segment: Dict, stock_options: Optional[List[Dict]]) -> Tuple[int, Dict]:
+        return i, await generate_scene_for_segment(semaphore, segment, context, stock_options)
+    
+    tasks = [
+        asyncio.create_task(generate(i, segment, stock_options))
+        for i, (segment, stock_options) in enumerate(zip(script_segments, stock_results))
+    ]
+    try:
+        for next_scene in asyncio.as_completed(tasks):
+            yield await next_scene
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
 def extract_visual_context(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
     """Extract visual context from parsed GEDCOM data"""
+    locations = extract_primary_locations(parsed_data)
     context = {
         "time_period": determine_primary_time_period(parsed_data),
-        "locations": extract_primary_locations(parsed_data),
+        "locations": locations,
         "themes": parsed_data.get("narrative_themes", []),
-        "ethnic_background": infer_ethnic_background(parsed_data),
+        "ethnic_background": infer_ethnic_background(locations),
         "key_events": parsed_data.get("key_events", [])
     }
     return context
@@ -57,20 +147,7 @@ def determine_primary_time_period(parsed_data: Dict[str, Any]) -> str:
     if not date_range.get("earliest"):
         return "modern"
     
-    earliest = date_range["earliest"]
-    
-    if earliest < 1800:
-        return "colonial"
-    elif earliest < 1850:
-        return "early_1800s"
-    elif earliest < 1900:
-        return "late_1800s"
-    elif earliest < 1950:
-        return "early_1900s"
-    elif earliest < 2000:
-        return "mid_1900s"
-    else:
-        return "modern"
+    return _PERIOD_LABELS[bisect.bisect_right(_PERIOD_CUTOFFS, date_range["earliest"])]
 
 
 def extract_primary_locations(parsed_data: Dict[str, Any]) -> List[str]:
@@ -92,39 +169,36 @@ def extract_primary_locations(parsed_data: Dict[str, Any]) -> List[str]:
     return locations
 
 
-def infer_ethnic_background(parsed_data: Dict[str, Any]) -> List[str]:
-    """Infer ethnic background from locations and names"""
-    backgrounds = []
+def infer_ethnic_background(locations: List[str]) -> List[str]:
+    """Infer ethnic background from the family's primary locations"""
+    backgrounds = set()
     
     # Analyze locations
-    locations = extract_primary_locations(parsed_data)
-    for loc in locations:
-        loc_lower = loc.lower()
-        if any(country in loc_lower for country in ["ireland", "irish"]):
-            backgrounds.append("irish")
-        elif any(country in loc_lower for country in ["germany", "german", "bavaria"]):
-            backgrounds.append("german")
-        elif any(country in loc_lower for country in ["italy", "italian"]):
-            backgrounds.append("italian")
-        elif any(country in loc_lower for country in ["england", "english", "britain"]):
-            backgrounds.append("british")
-        elif any(country in loc_lower for country in ["scotland", "scottish"]):
-            backgrounds.append("scottish")
-        elif any(country in loc_lower for country in ["poland", "polish"]):
-            backgrounds.append("polish")
-        elif any(country in loc_lower for country in ["mexico", "mexican"]):
-            backgrounds.append("mexican")
-        elif any(country in loc_lower for country in ["china", "chinese"]):
-            backgrounds.append("chinese")
-        elif any(country in loc_lower for country in ["africa", "african"]):
-            backgrounds.append("african")
-    
-    return list(set(backgrounds))
+    for match in _ETHNIC_RE.finditer("\n".join(locations)):
+        backgrounds.add(match.lastgroup)
+    
+    return list(backgrounds)
+
+
+def build_stock_query(segment: Dict[str, Any], context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build the stock footage query for a segment, or None if it uses a template"""
+    segment_type = segment.get("type", "general")
+    
+    if segment_type == "opening":
+        return build_opening_query(context)
+    elif segment_type in ("family_overview", "geographic_journey", "timeline"):
+        return None
+    elif segment_type == "themes":
+        return build_thematic_query(context)
+    else:
+        return build_generic_query(context)
 
 
 async def generate_scene_for_segment(
+    semaphore: asyncio.Semaphore,
     segment: Dict[str, Any],
-    context: Dict[str, Any]
+    context: Dict[str, Any],
+    stock_options: Optional[List[Dict]] = None
 ) -> Dict[str, Any]:
     """Generate appropriate visual scene for a script segment"""
     
@@ -132,18 +206,9 @@ async def generate_scene_for_segment(
     duration = segment.get("duration", 10)
     
     # Determine visual strategy based on segment type
-    if segment_type == "opening":
-        scene = await generate_opening_scene(context)
-    elif segment_type == "family_overview":
-        scene = await generate_family_tree_scene(context)
-    elif segment_type == "geographic_journey":
-        scene = await generate_map_scene(context)
-    elif segment_type == "timeline":
-        scene = await generate_timeline_scene(context)
-    elif segment_type == "themes":
-        scene = await generate_thematic_scene(segment, context)
-    else:
-        scene = await generate_generic_scene(context)
+    generate_scene = _SCENE_GENERATORS.get(segment_type, generate_generic_scene)
+    async with semaphore:
+        scene = await generate_scene(segment, context, stock_options)
     
     scene["duration"] = duration
     scene["segment_type"] = segment_type
@@ -151,10 +216,9 @@ async def generate_scene_for_segment(
     return scene
 
 
-async def generate_opening_scene(context: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate an compelling opening visual"""
+def build_opening_query(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the stock footage query for a period-appropriate establishing shot"""
     
-    # Try to get period-appropriate establishing shot
     time_period = context.get("time_period", "modern")
     locations = context.get("locations", [])
     
@@ -163,12 +227,18 @@ async def generate_opening_scene(context: Dict[str, Any]) -> Dict[str, Any]:
     if locations:
         search_tags.append(locations[0].split(",")[0])  # Primary location
     
-    # Get stock footage
-    stock_options = await get_stock_footage(
-        tags=search_tags,
-        era=time_period,
-        limit=5
-    )
+    return {"tags": search_tags, "era": time_period, "limit": 5}
+
+
+async def generate_opening_scene(
+    context: Dict[str, Any],
+    stock_options: Optional[List[Dict]] = None
+) -> Dict[str, Any]:
+    """Generate an compelling opening visual"""
+    
+    # Try to get period-appropriate establishing shot
+    if stock_options is None:
+        stock_options = await get_stock_footage(**build_opening_query(context))
     
     if stock_options:
         selected = stock_options[0]
@@ -254,33 +324,37 @@ async def generate_timeline_scene(context: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-async def generate_thematic_scene(segment: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate scene based on narrative themes"""
+def build_thematic_query(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the stock footage query for the family's narrative themes"""
     
     themes = context.get("themes", [])
     time_period = context.get("time_period", "modern")
     
-    # Map themes to visual concepts
-    theme_visuals = {
-        "immigration": ["ship", "ellis island", "voyage", "new land"],
-        "military_service": ["uniform", "flag", "medals", "service"],
-        "large_family": ["gathering", "reunion", "children", "generations"],
-        "farming": ["farmland", "harvest", "rural", "agriculture"],
-        "urban": ["city", "industry", "streets", "buildings"]
-    }
-    
     search_tags = [time_period]
     for theme in themes:
-        if theme in theme_visuals:
-            search_tags.extend(theme_visuals[theme])
+        if theme in _THEME_VISUALS:
+            search_tags.extend(_THEME_VISUALS[theme])
+    
+    return {
+        "tags": search_tags,
+        "era": time_period,
+        "theme": themes[0] if themes else "family",
+        "limit": 3
+    }
+
+
+async def generate_thematic_scene(
+    segment: Dict[str, Any],
+    context: Dict[str, Any],
+    stock_options: Optional[List[Dict]] = None
+) -> Dict[str, Any]:
+    """Generate scene based on narrative themes"""
+    
+    themes = context.get("themes", [])
     
     # Get appropriate stock footage
-    stock_options = await get_stock_footage(
-        tags=search_tags,
-        era=time_period,
-        theme=themes[0] if themes else "family",
-        limit=3
-    )
+    if stock_options is None:
+        stock_options = await get_stock_footage(**build_thematic_query(context))
     
     if stock_options:
         selected = stock_options[0]
@@ -293,25 +367,33 @@ async def generate_thematic_scene(segment: Dict[str, Any], context: Dict[str, An
         }
     
     # Fallback to generic
-    return await generate_generic_scene(context)
+    return await generate_generic_scene(segment, context)
 
 
-async def generate_generic_scene(context: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate a generic period-appropriate scene"""
+def build_generic_query(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the stock footage query for generic family/heritage visuals"""
     
     time_period = context.get("time_period", "modern")
-    
-    # Generic family/heritage visuals
     search_tags = [time_period, "family", "heritage", "vintage", "memories"]
     
-    stock_options = await get_stock_footage(
-        tags=search_tags,
-        era=time_period,
-        limit=5
-    )
+    return {"tags": search_tags, "era": time_period, "limit": 5}
+
+
+async def generate_generic_scene(
+    segment: Dict[str, Any],
+    context: Dict[str, Any],
+    stock_options: Optional[List[Dict]] = None
+) -> Dict[str, Any]:
+    """Generate a generic period-appropriate scene"""
+    
+    # Generic family/heritage visuals
+    if stock_options is None:
+        stock_options = await get_stock_footage(**build_generic_query(context))
     
     if stock_options:
-        selected = random.choice(stock_options)
+        # Pick by the segment's text so retries select the same footage
+        seed = zlib.crc32(segment.get("text", "").encode())
+        selected = stock_options[seed % len(stock_options)]
         return {
             "type": "stock_footage",
             "url": selected["file_url"],
@@ -330,6 +412,17 @@ async def generate_generic_scene(context: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+# Scene generator for each segment type, called with (segment, context, stock_options);
+# other types get a generic scene
+_SCENE_GENERATORS = {
+    "opening": lambda segment, context, stock_options: generate_opening_scene(context, stock_options),
+    "family_overview": lambda segment, context, stock_options: generate_family_tree_scene(context),
+    "geographic_journey": lambda segment, context, stock_options: generate_map_scene(context),
+    "timeline": lambda segment, context, stock_options: generate_timeline_scene(context),
+    "themes": generate_thematic_scene
+}
+
+
 def build_ai_prompt_for_opening(context: Dict[str, Any]) -> str:
     """Build AI image generation prompt for opening scene"""
     
@@ -337,36 +430,89 @@ def build_ai_prompt_for_opening(context: Dict[str, Any]) -> str:
     locations = context.get("locations", [])
     backgrounds = context.get("ethnic_background", [])
     
-    # Map time periods to visual styles
-    period_styles = {
-        "colonial": "colonial era painting style, 1700s aesthetic",
-        "early_1800s": "19th century daguerreotype style, sepia toned",
-        "late_1800s": "Victorian era photography, vintage portrait",
-        "early_1900s": "early 20th century photograph, slightly faded",
-        "mid_1900s": "mid-century photograph, color but nostalgic",
-        "modern": "contemporary but timeless photographic style"
-    }
+    style = _PERIOD_STYLES.get(time_period, "vintage photographic style")
     
-    style = period_styles.get(time_period, "vintage photographic style")
-    
-    prompt = f"A beautiful, emotional establishing shot in {style}. "
+    parts = [f"A beautiful, emotional establishing shot in {style}. "]
     
     if locations:
         location = locations[0].split(",")[0]
-        prompt += f"Scene depicts {location} during the {time_period.replace('_', ' ')}. "
+        parts.append(f"Scene depicts {location} during the {time_period.replace('_', ' ')}. ")
+    
+    parts.append(
+        "Cinematic composition, documentary quality, historical accuracy, emotional resonance. "
+        "No people in frame, focus on location and atmosphere."
+    )
+    
+    return "".join(parts)
+
+
+def _stock_cache_key(query: Dict[str, Any]) -> str:
+    # Tag order and repeats don't change the results, so normalise them away
+    frozen = orjson.dumps({
+        "tags": sorted(set(query["tags"])),
+        "era": query.get("era"),
+        "theme": query.get("theme"),
+        "limit": query.get("limit", 5)
+    })
+    return f"stock:{hashlib.blake2b(frozen, digest_size=16).hexdigest()}"
+
+
+async def get_cached_stock_footage(queries: List[Dict]) -> List[List[Dict]]:
+    """Run stock footage queries, reusing results cached by earlier documentaries"""
+    keys = [_stock_cache_key(query) for query in queries]
+    try:
+        cached = await asyncio.to_thread(redis_client.mget, keys)
+    except RedisError:
+        cached = [None] * len(keys)
+    results = [orjson.loads(value) if value else None for value in cached]
     
-    prompt += "Cinematic composition, documentary quality, historical accuracy, emotional resonance. "
-    prompt += "No people in frame, focus on location and atmosphere."
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        fetched = await get_stock_footage_batch([queries[i] for i in misses])
+        for i, result in zip(misses, fetched):
+            results[i] = result
+        try:
+            await asyncio.to_thread(
+                _cache_stock_results, [(keys[i], results[i]) for i in misses]
+            )
+        except RedisError:
+            pass
     
-    return prompt
+    return results
+
+
+def _cache_stock_results(entries: List[Tuple[str, List[Dict]]]) -> None:
+    pipe = redis_client.pipeline(transaction=False)
+    for key, result in entries:
+        pipe.setex(key, STOCK_FOOTAGE_CACHE_TTL, orjson.dumps(result))
+    pipe.execute()
 
 
 # Mock service functions (would be replaced with actual implementations)
+async def simulate_latency(seconds: float) -> None:
+    """Wait like an external API call would, if SIMULATE_EXTERNAL_LATENCY is set"""
+    if settings.SIMULATE_EXTERNAL_LATENCY:
+        await asyncio.sleep(seconds)
+
+
 async def get_stock_footage(tags: List[str], era: str = None, theme: str = None, limit: int = 5) -> List[Dict]:
     """Mock function to get stock footage - would query actual database"""
-    await asyncio.sleep(0.1)  # Simulate API call
+    async with _stock_footage_semaphore:
+        await simulate_latency(0.1)
     
-    # Return mock data
+    return mock_stock_results(tags, era, theme, limit)
+
+
+async def get_stock_footage_batch(queries: List[Dict]) -> List[List[Dict]]:
+    """Mock function to run several stock footage queries in one request"""
+    async with _stock_footage_semaphore:
+        await simulate_latency(0.1)  # A single API call
+    
+    return [mock_stock_results(**query) for query in queries]
+
+
+def mock_stock_results(tags: List[str], era: str = None, theme: str = None, limit: int = 5) -> List[Dict]:
+    """Build mock stock footage results for one query"""
     return [
         {
             "id": f"stock_{i}",
@@ -382,7 +528,8 @@ async def get_stock_footage(tags: List[str], era: str = None, theme: str = None,
 
 async def generate_ai_images(prompts: List[str]) -> List[Dict]:
     """Mock function for AI image generation - would call DALL-E or similar"""
-    await asyncio.sleep(0.5)  # Simulate API call
+    async with _ai_image_semaphore:
+        await simulate_latency(0.5)
     
     return [
         {
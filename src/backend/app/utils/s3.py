@@ -3,29 +3,88 @@ AWS S3 utility functions
 """
 
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import errno
+import io
 import os
-from typing import Optional
-import aiofiles
+import shutil
+import threading
+import time
+import uuid
+from typing import BinaryIO, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
 import asyncio
 
 from app.core.config import settings
 
 
-# Initialize S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION
+# The S3 client is created on first use, so importing this module doesn't
+# pay for loading boto3's service model and resolving credentials
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Get the shared S3 client
+    
+    Throttling and transient 5xx errors are retried with backoff, and
+    adaptive mode slows the client down while S3 throttles. Unless
+    S3_ENDPOINT_URL points elsewhere, requests go straight to the bucket's
+    regional virtual-hosted endpoint, so none are redirected from the
+    global one. The pool holds a connection per
+    executor thread so concurrent part transfers never queue for one.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION,
+                    endpoint_url=settings.S3_ENDPOINT_URL,
+                    config=Config(
+                        signature_version='s3v4',
+                        # S3-compatible servers generally only route path-style
+                        s3={'addressing_style': 'path' if settings.S3_ENDPOINT_URL else 'virtual'},
+                        retries={'max_attempts': 10, 'mode': 'adaptive'},
+                        max_pool_connections=settings.THREAD_POOL_MAX_WORKERS,
+                        tcp_keepalive=True,
+                        connect_timeout=5,
+                        read_timeout=60
+                    )
+                )
+    return _s3_client
+
+
+# Streamed uploads switch to multipart above 8MB, sending 16MB parts 8 at a time
+transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=8
 )
 
+# Public URL of an object is this prefix followed by its key; custom
+# endpoints are addressed path-style, like the client itself
+if settings.S3_ENDPOINT_URL:
+    S3_URL_PREFIX = f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{settings.S3_BUCKET_NAME}/"
+else:
+    S3_URL_PREFIX = f"https://{settings.S3_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/"
+
 
 async def upload_file_to_s3(
     file_content: bytes = None,
     file_path: str = None,
     s3_key: str = None,
-    content_type: str = "application/octet-stream"
+    content_type: str = "application/octet-stream",
+    file_obj: BinaryIO = None
 ) -> str:
     """
     Upload file to S3 bucket
@@ -34,6 +93,7 @@ async def upload_file_to_s3(
         file_content: File content as bytes (if uploading from memory)
         file_path: Path to local file (if uploading from disk)
         s3_key: S3 object key (path in bucket)
+        file_obj: Readable binary file object (streamed in multipart chunks)
         content_type: MIME type of the file
         
     Returns:
@@ -43,78 +103,444 @@ async def upload_file_to_s3(
     if not s3_key:
         raise ValueError("S3 key is required")
     
+    # boto3 is blocking, so every transfer runs on the default executor
     if file_content:
-        # Upload from memory
+        # Upload from memory; large bodies go through the multipart transfer
+        # manager as a BytesIO view instead of one single-stream PUT
         try:
-            s3_client.put_object(
-                Bucket=settings.S3_BUCKET_NAME,
-                Key=s3_key,
-                Body=file_content,
-                ContentType=content_type
-            )
-        except ClientError as e:
+            if len(file_content) > transfer_config.multipart_threshold:
+                await asyncio.to_thread(
+                    get_s3_client().upload_fileobj,
+                    io.BytesIO(file_content),
+                    settings.S3_BUCKET_NAME,
+                    s3_key,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=transfer_config
+                )
+            else:
+                await asyncio.to_thread(
+                    get_s3_client().put_object,
+                    Bucket=settings.S3_BUCKET_NAME,
+                    Key=s3_key,
+                    Body=file_content,
+                    ContentType=content_type
+                )
+        except (ClientError, S3UploadFailedError) as e:
             raise Exception(f"Failed to upload to S3: {str(e)}")
     
     elif file_path:
-        # Upload from file
+        # Upload from file; s3transfer reads parts straight from the path
+        # on its own threads, with the same part sizing as streamed uploads
         try:
-            with open(file_path, 'rb') as file:
-                s3_client.upload_fileobj(
-                    file,
-                    settings.S3_BUCKET_NAME,
-                    s3_key,
-                    ExtraArgs={'ContentType': content_type}
-                )
-        except ClientError as e:
+            await asyncio.to_thread(
+                get_s3_client().upload_file,
+                file_path,
+                settings.S3_BUCKET_NAME,
+                s3_key,
+                ExtraArgs={'ContentType': content_type},
+                Config=transfer_config
+            )
+        except (ClientError, S3UploadFailedError) as e:
+            raise Exception(f"Failed to upload to S3: {str(e)}")
+    
+    elif file_obj:
+        # Stream from an open file object without reading it into memory
+        try:
+            await asyncio.to_thread(
+                get_s3_client().upload_fileobj,
+                file_obj,
+                settings.S3_BUCKET_NAME,
+                s3_key,
+                ExtraArgs={'ContentType': content_type},
+                Config=transfer_config
+            )
+        except (ClientError, S3UploadFailedError) as e:
             raise Exception(f"Failed to upload to S3: {str(e)}")
     else:
-        raise ValueError("Either file_content or file_path must be provided")
+        raise ValueError("Either file_content, file_path or file_obj must be provided")
     
     # Return public URL
-    return f"https://{settings.S3_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_key}"
+    return S3_URL_PREFIX + s3_key
+
+
+# Streamed uploads buffer at most UPLOAD_CONCURRENCY parts in memory
+UPLOAD_PART_SIZE = 8 * 1024 * 1024  # 8MB
+UPLOAD_CONCURRENCY = 8
+
+
+async def _read_part(stream: asyncio.StreamReader, size: int) -> bytes:
+    """Read up to size bytes, returning short only at end of stream"""
+    try:
+        return await stream.readexactly(size)
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+
+
+async def upload_stream_to_s3(
+    stream: asyncio.StreamReader,
+    s3_key: str,
+    content_type: str = "application/octet-stream"
+) -> str:
+    """
+    Upload a stream of unknown length to S3 as it is produced
+    
+    Parts are uploaded concurrently while the stream is still being read;
+    reading pauses whenever UPLOAD_CONCURRENCY parts are in flight.
+    
+    Args:
+        stream: Stream to read until EOF, e.g. a subprocess's stdout
+        s3_key: S3 object key
+        content_type: MIME type
+    
+    Returns:
+        Public URL of uploaded file
+    """
+    try:
+        response = await asyncio.to_thread(
+            get_s3_client().create_multipart_upload,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            ContentType=content_type,
+            ChecksumAlgorithm='CRC32'
+        )
+    except ClientError as e:
+        raise Exception(f"Failed to upload to S3: {str(e)}")
+    
+    upload_id = response['UploadId']
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    tasks = []
+    
+    async def upload_part(part_number: int, body: bytes) -> dict:
+        try:
+            response = await asyncio.to_thread(
+                get_s3_client().upload_part,
+                Bucket=settings.S3_BUCKET_NAME,
+                Key=s3_key,
+                PartNumber=part_number,
+                UploadId=upload_id,
+                Body=body,
+                # S3 verifies each part against its CRC32 as it is received
+                ChecksumAlgorithm='CRC32'
+            )
+        finally:
+            semaphore.release()
+        part = {'PartNumber': part_number, 'ETag': response['ETag']}
+        # Some S3-compatible servers accept the checksum but don't echo it
+        if 'ChecksumCRC32' in response:
+            part['ChecksumCRC32'] = response['ChecksumCRC32']
+        return part
+    
+    try:
+        part_number = 1
+        while True:
+            await semaphore.acquire()
+            # Stop reading as soon as any part has failed
+            for task in tasks:
+                if task.done():
+                    task.result()
+            body = await _read_part(stream, UPLOAD_PART_SIZE)
+            # Only the first part may be empty, so an empty stream still uploads
+            if not body and part_number > 1:
+                semaphore.release()
+                break
+            tasks.append(asyncio.create_task(upload_part(part_number, body)))
+            if len(body) < UPLOAD_PART_SIZE:
+                break
+            part_number += 1
+        
+        parts = await asyncio.gather(*tasks)
+        
+        await asyncio.to_thread(
+            get_s3_client().complete_multipart_upload,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(
+            get_s3_client().abort_multipart_upload,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id
+        )
+        raise Exception(f"Failed to upload stream to S3: {str(e)}")
+    
+    return S3_URL_PREFIX + s3_key
+
+
+def parse_s3_url(s3_url: str) -> Tuple[str, str]:
+    """
+    Split an S3 URL into its bucket and object key
+    
+    Virtual-hosted URLs name the bucket in the host and path-style URLs in
+    the first path segment. Bare keys, and URLs on hosts that are neither,
+    are taken to be in S3_BUCKET_NAME.
+    
+    Args:
+        s3_url: S3 URL or key
+        
+    Returns:
+        (bucket, key) tuple
+    """
+    if not s3_url.startswith(("https://", "http://")):
+        return settings.S3_BUCKET_NAME, s3_url
+    
+    url = urlsplit(s3_url)
+    host = url.hostname or ""
+    path = url.path.lstrip("/")
+    
+    # bucket.s3.amazonaws.com, bucket.s3.region.amazonaws.com, bucket.s3-region...
+    for marker in (".s3.", ".s3-"):
+        if marker in host:
+            return host.split(marker, 1)[0], path
+    
+    # s3.region.amazonaws.com/bucket/key, or a custom endpoint
+    endpoint_host = urlsplit(settings.S3_ENDPOINT_URL).hostname if settings.S3_ENDPOINT_URL else None
+    if host.startswith(("s3.", "s3-")) or host == endpoint_host:
+        bucket, _, key = path.partition("/")
+        if bucket and key:
+            return bucket, key
+    
+    return settings.S3_BUCKET_NAME, path
+
+
+def get_s3_key(s3_url: str) -> str:
+    """Extract the object key from an S3 URL, or return a bare key unchanged"""
+    return parse_s3_url(s3_url)[1]
+
+
+# Downloads are streamed to disk this many bytes at a time
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+def _open_for_write(path: str) -> BinaryIO:
+    """Open path for writing, creating its directory only if it is missing"""
+    try:
+        return open(path, 'wb')
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, 'wb')
+
+
+def _stream_object_to_file(
+    bucket: str,
+    s3_key: str,
+    local_path: str,
+    etag: Optional[str] = None
+) -> None:
+    """Write an S3 object to disk as its body arrives, optionally pinned to an ETag"""
+    extra_args = {'IfMatch': etag} if etag else {}
+    response = get_s3_client().get_object(
+        Bucket=bucket,
+        Key=s3_key,
+        **extra_args
+    )
+    # Like download_file, never leave a truncated file at local_path
+    partial_path = f"{local_path}.{uuid.uuid4().hex}.partial"
+    try:
+        with _open_for_write(partial_path) as file:
+            for chunk in response['Body'].iter_chunks(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+        os.replace(partial_path, local_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
 
 
 async def download_file_from_s3(s3_url: str, local_path: str) -> None:
     """
     Download file from S3
     
+    The object body is streamed to disk in one executor job, so only a
+    chunk at a time is held in memory and the event loop keeps running.
+    
     Args:
-        s3_url: S3 URL or key
+        s3_url: S3 URL or key; URLs are fetched from the bucket they name
         local_path: Path to save the file locally
     """
     
-    # Extract key from URL if needed
-    if s3_url.startswith("https://") or s3_url.startswith("http://"):
-        # Parse S3 key from URL
-        parts = s3_url.split(f"{settings.S3_BUCKET_NAME}.s3")
-        if len(parts) > 1:
-            s3_key = parts[1].split(".amazonaws.com/")[1]
+    bucket, s3_key = parse_s3_url(s3_url)
+    
+    try:
+        # Download file; its directory is only created if the write fails
+        await asyncio.to_thread(_stream_object_to_file, bucket, s3_key, local_path)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            raise Exception(f"File not found in S3: {s3_key}")
         else:
-            s3_key = s3_url.split("/")[-1]
-    else:
-        s3_key = s3_url
+            raise Exception(f"Failed to download from S3: {str(e)}")
+
+
+async def download_cached_file_from_s3(s3_url: str, local_path: str) -> None:
+    """
+    Download file from S3 through the local asset cache
+    
+    Objects are cached on disk under their ETag, so assets shared between
+    jobs cost a HEAD request instead of a full download. Hits are hard
+    linked into place, or copied when the cache is on another filesystem;
+    the least recently used entries are evicted once the cache exceeds
+    ASSET_CACHE_MAX_BYTES.
+    
+    Args:
+        s3_url: S3 URL or key; URLs are fetched from the bucket they name
+        local_path: Path to save the file locally
+    """
+    bucket, s3_key = parse_s3_url(s3_url)
     
     try:
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        
-        # Download file
-        s3_client.download_file(
-            settings.S3_BUCKET_NAME,
-            s3_key,
-            local_path
+        head = await asyncio.to_thread(
+            get_s3_client().head_object,
+            Bucket=bucket,
+            Key=s3_key
         )
+        etag = head['ETag'].strip('"')
+        cache_path = os.path.join(settings.ASSET_CACHE_DIR, etag)
+        
+        try:
+            # Mark as recently used; atime alone is unreliable on noatime mounts
+            os.utime(cache_path)
+        except FileNotFoundError:
+            # Pin the download to the ETag so the cache entry can't go stale
+            await asyncio.to_thread(
+                _stream_object_to_file, bucket, s3_key, cache_path, head['ETag']
+            )
+            await asyncio.to_thread(evict_asset_cache)
     except ClientError as e:
-        if e.response['Error']['Code'] == '404':
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
             raise Exception(f"File not found in S3: {s3_key}")
         else:
             raise Exception(f"Failed to download from S3: {str(e)}")
+    
+    try:
+        try:
+            await asyncio.to_thread(link_or_copy_file, cache_path, local_path)
+        except FileNotFoundError:
+            # Only create the directory once a link into it has failed
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            await asyncio.to_thread(link_or_copy_file, cache_path, local_path)
+    except OSError:
+        # The entry was just evicted
+        await download_file_from_s3(s3_url, local_path)
+
+
+def link_or_copy_file(source_path: str, dest_path: str) -> None:
+    """Hard link a file into place, copying it if the paths are on different filesystems"""
+    try:
+        os.link(source_path, dest_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Copy beside the destination so a failed copy never leaves it truncated
+        partial_path = f"{dest_path}.{uuid.uuid4().hex}.partial"
+        try:
+            shutil.copyfile(source_path, partial_path)
+            os.replace(partial_path, dest_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+
+def evict_asset_cache() -> None:
+    """Remove least recently used cache entries until under the size limit"""
+    entries = []
+    for entry in os.scandir(settings.ASSET_CACHE_DIR):
+        if entry.is_file() and not entry.name.endswith('.partial'):
+            stat = entry.stat()
+            entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, entry.path))
+    
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= settings.ASSET_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+# Objects larger than one part are fetched with concurrent ranged GETs
+DOWNLOAD_PART_SIZE = 8 * 1024 * 1024  # 8MB
+DOWNLOAD_CONCURRENCY = 16
+
+
+def _get_object_range(s3_key: str, start: int, end: int, etag: str) -> bytes:
+    """Fetch an inclusive byte range of an S3 object"""
+    response = get_s3_client().get_object(
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=s3_key,
+        Range=f"bytes={start}-{end}",
+        IfMatch=etag
+    )
+    return response['Body'].read()
+
+
+async def read_file_from_s3(s3_key: str) -> bytes:
+    """
+    Read an S3 object into memory
+    
+    Large objects are split into DOWNLOAD_PART_SIZE ranges that are fetched
+    concurrently and written straight into one preallocated buffer.
+    
+    Args:
+        s3_key: S3 object key
+        
+    Returns:
+        Object content as bytes
+    """
+    try:
+        head = await asyncio.to_thread(
+            get_s3_client().head_object,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key
+        )
+        size = head['ContentLength']
+        etag = head['ETag']
+        
+        if size == 0:
+            return b""
+        if size <= DOWNLOAD_PART_SIZE:
+            return await asyncio.to_thread(_get_object_range, s3_key, 0, size - 1, etag)
+        
+        buffer = bytearray(size)
+        semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        
+        async def fetch_range(start: int) -> None:
+            end = min(start + DOWNLOAD_PART_SIZE, size) - 1
+            async with semaphore:
+                data = await asyncio.to_thread(_get_object_range, s3_key, start, end, etag)
+            buffer[start:end + 1] = data
+        
+        await asyncio.gather(
+            *(fetch_range(start) for start in range(0, size, DOWNLOAD_PART_SIZE))
+        )
+        return bytes(buffer)
+    except ClientError as e:
+        raise Exception(f"Failed to download from S3: {str(e)}")
+
+
+@lru_cache(maxsize=4096)
+def _presigned_url(s3_key: str, expiration: int, window: int) -> str:
+    """Sign a GET URL; cached per key for one expiration window"""
+    return get_s3_client().generate_presigned_url(
+        'get_object',
+        Params={'Bucket': settings.S3_BUCKET_NAME, 'Key': s3_key},
+        ExpiresIn=expiration
+    )
 
 
 def generate_presigned_url(s3_key: str, expiration: int = 3600) -> str:
     """
     Generate a presigned URL for S3 object
     
+    URLs are reused for half their lifetime, so repeat requests for a key
+    skip re-signing and get the same, browser-cacheable URL, and a returned
+    URL always has at least expiration / 2 seconds left.
+    
     Args:
         s3_key: S3 object key
         expiration: URL expiration time in seconds
@@ -122,16 +548,103 @@ def generate_presigned_url(s3_key: str, expiration: int = 3600) -> str:
     Returns:
         Presigned URL
     """
+    window = int(time.time() // max(expiration // 2, 1))
+    try:
+        return _presigned_url(s3_key, expiration, window)
+    except ClientError as e:
+        raise Exception(f"Failed to generate presigned URL: {str(e)}")
+
+
+def generate_presigned_post(
+    s3_key: str,
+    max_size: int,
+    content_type: str = "text/plain",
+    expiration: int = 900
+) -> dict:
+    """
+    Generate a presigned POST so a browser can upload straight to S3
+    
+    Args:
+        s3_key: S3 object key the upload is pinned to
+        max_size: Largest accepted body in bytes
+        content_type: Content-Type the form must send
+        expiration: Policy expiration time in seconds
+        
+    Returns:
+        Dict with the form "url" and the "fields" to post alongside the file
+    """
     try:
-        response = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': settings.S3_BUCKET_NAME, 'Key': s3_key},
+        return get_s3_client().generate_presigned_post(
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                ['content-length-range', 1, max_size],
+                {'Content-Type': content_type}
+            ],
             ExpiresIn=expiration
         )
     except ClientError as e:
-        raise Exception(f"Failed to generate presigned URL: {str(e)}")
+        raise Exception(f"Failed to generate presigned POST: {str(e)}")
+
+
+# Server-side copies are split into 64MB UploadPartCopy ranges above 64MB;
+# no bytes pass through this host either way
+copy_transfer_config = TransferConfig(
+    multipart_threshold=64 * 1024 * 1024,
+    multipart_chunksize=64 * 1024 * 1024,
+    max_concurrency=10
+)
+
+
+async def copy_file_in_s3(source_key: str, dest_key: str) -> str:
+    """
+    Copy an object within the bucket without downloading it
+    
+    Small objects take a single CopyObject; larger ones, including those over
+    CopyObject's 5GB limit, are copied as concurrent part ranges.
     
-    return response
+    Args:
+        source_key: S3 object key to copy from
+        dest_key: S3 object key to copy to
+        
+    Returns:
+        Public URL of the copy
+    """
+    try:
+        await asyncio.to_thread(
+            get_s3_client().copy,
+            {'Bucket': settings.S3_BUCKET_NAME, 'Key': source_key},
+            settings.S3_BUCKET_NAME,
+            dest_key,
+            Config=copy_transfer_config
+        )
+    except ClientError as e:
+        raise Exception(f"Failed to copy in S3: {str(e)}")
+    
+    return S3_URL_PREFIX + dest_key
+
+
+def file_exists_in_s3(s3_key: str) -> bool:
+    """
+    Check whether an object exists in S3
+    
+    Args:
+        s3_key: S3 object key
+        
+    Returns:
+        True if the object exists
+    """
+    try:
+        get_s3_client().head_object(
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            return False
+        raise Exception(f"Failed to check S3 object: {str(e)}")
 
 
 def delete_file_from_s3(s3_key: str) -> bool:
@@ -145,7 +658,7 @@ def delete_file_from_s3(s3_key: str) -> bool:
         True if successful
     """
     try:
-        s3_client.delete_object(
+        get_s3_client().delete_object(
             Bucket=settings.S3_BUCKET_NAME,
             Key=s3_key
         )
@@ -154,28 +667,69 @@ def delete_file_from_s3(s3_key: str) -> bool:
         raise Exception(f"Failed to delete from S3: {str(e)}")
 
 
-def list_files_in_s3(prefix: str = "", max_keys: int = 1000) -> list:
+# DeleteObjects accepts at most this many keys per request
+DELETE_BATCH_SIZE = 1000
+DELETE_CONCURRENCY = 4
+
+
+def _delete_batch(keys: list) -> list:
+    """Delete one batch of keys, returning the per-key errors"""
+    response = get_s3_client().delete_objects(
+        Bucket=settings.S3_BUCKET_NAME,
+        Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+    )
+    return response.get('Errors', [])
+
+
+def delete_files_from_s3(s3_keys: list) -> bool:
+    """
+    Delete many files from S3, DELETE_BATCH_SIZE keys per request
+    
+    Args:
+        s3_keys: S3 object keys
+        
+    Returns:
+        True if successful
+    """
+    batches = [
+        s3_keys[start:start + DELETE_BATCH_SIZE]
+        for start in range(0, len(s3_keys), DELETE_BATCH_SIZE)
+    ]
+    try:
+        with ThreadPoolExecutor(max_workers=DELETE_CONCURRENCY) as executor:
+            errors = [error for batch in executor.map(_delete_batch, batches) for error in batch]
+    except ClientError as e:
+        raise Exception(f"Failed to delete from S3: {str(e)}")
+    
+    if errors:
+        failed = ", ".join(f"{error['Key']} ({error['Code']})" for error in errors[:10])
+        raise Exception(f"Failed to delete {len(errors)} objects from S3: {failed}")
+    return True
+
+
+def list_files_in_s3(prefix: str = "", max_keys: Optional[int] = None) -> Iterator[str]:
     """
     List files in S3 bucket with given prefix
     
+    Keys are yielded page by page as they are listed, so any number of
+    objects can be walked without holding them all in memory.
+    
     Args:
         prefix: Prefix to filter objects
-        max_keys: Maximum number of keys to return
+        max_keys: Maximum number of keys to return, or None for all
         
     Returns:
-        List of S3 object keys
+        Iterator of S3 object keys
     """
+    paginator = get_s3_client().get_paginator('list_objects_v2')
     try:
-        response = s3_client.list_objects_v2(
+        for page in paginator.paginate(
             Bucket=settings.S3_BUCKET_NAME,
             Prefix=prefix,
-            MaxKeys=max_keys
-        )
-        
-        if 'Contents' in response:
-            return [obj['Key'] for obj in response['Contents']]
-        else:
-            return []
+            PaginationConfig={'PageSize': 1000, 'MaxItems': max_keys}
+        ):
+            for obj in page.get('Contents', ()):
+                yield obj['Key']
     
     except ClientError as e:
         raise Exception(f"Failed to list S3 objects: {str(e)}")
@@ -185,75 +739,42 @@ async def upload_large_file_multipart(
     file_path: str,
     s3_key: str,
     content_type: str = "application/octet-stream",
-    chunk_size: int = 5 * 1024 * 1024  # 5MB chunks
+    chunk_size: int = 5 * 1024 * 1024,  # 5MB chunks
+    max_concurrency: int = 16
 ) -> str:
     """
     Upload large file using multipart upload
     
+    The boto3 transfer manager splits the file into chunk_size parts and
+    uploads up to max_concurrency of them at once, retrying failed parts
+    and aborting the upload if it cannot complete.
+    
     Args:
         file_path: Path to local file
         s3_key: S3 object key
         content_type: MIME type
         chunk_size: Size of each chunk in bytes
+        max_concurrency: Parts in flight at once
         
     Returns:
         Public URL of uploaded file
     """
-    
-    # Initiate multipart upload
-    response = s3_client.create_multipart_upload(
-        Bucket=settings.S3_BUCKET_NAME,
-        Key=s3_key,
-        ContentType=content_type
+    config = TransferConfig(
+        multipart_threshold=chunk_size,
+        multipart_chunksize=chunk_size,
+        max_concurrency=max_concurrency
     )
     
-    upload_id = response['UploadId']
-    parts = []
-    
     try:
-        # Upload file in chunks
-        async with aiofiles.open(file_path, 'rb') as file:
-            part_number = 1
-            
-            while True:
-                data = await file.read(chunk_size)
-                if not data:
-                    break
-                
-                # Upload part
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: s3_client.upload_part(
-                        Bucket=settings.S3_BUCKET_NAME,
-                        Key=s3_key,
-                        PartNumber=part_number,
-                        UploadId=upload_id,
-                        Body=data
-                    )
-                )
-                
-                parts.append({
-                    'PartNumber': part_number,
-                    'ETag': response['ETag']
-                })
-                
-                part_number += 1
-        
-        # Complete multipart upload
-        s3_client.complete_multipart_upload(
-            Bucket=settings.S3_BUCKET_NAME,
-            Key=s3_key,
-            UploadId=upload_id,
-            MultipartUpload={'Parts': parts}
-        )
-        
-        return f"https://{settings.S3_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_key}"
-    
-    except Exception as e:
-        # Abort multipart upload on error
-        s3_client.abort_multipart_upload(
-            Bucket=settings.S3_BUCKET_NAME,
-            Key=s3_key,
-            UploadId=upload_id
+        await asyncio.to_thread(
+            get_s3_client().upload_file,
+            file_path,
+            settings.S3_BUCKET_NAME,
+            s3_key,
+            ExtraArgs={'ContentType': content_type, 'ChecksumAlgorithm': 'CRC32'},
+            Config=config
         )
+    except (ClientError, S3UploadFailedError) as e:
         raise Exception(f"Failed to upload large file: {str(e)}")
+    
+    return S3_URL_PREFIX + s3_key
@@ -0,0 +1,277 @@
+"""
+Celery worker for GEDCOM processing and documentary generation
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import asyncio
+
+from celery import Celery
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.crud import crud_project
+from app.db.database import WorkerSessionLocal
+from app.models.models import Project, SubscriptionTier, VideoStatus
+from app.services.ai_narrator import (
+    collect_narration_batches as collect_batch_scripts,
+    enqueue_batch_narration,
+    submit_narration_batch
+)
+from app.services.gedcom_processor import process_gedcom_file
+from app.services.video_generator import generate_documentary
+
+celery = Celery("legacylabs", broker=settings.REDIS_URL, backend=settings.REDIS_URL)
+celery.conf.update(
+    # Redeliver a task if its worker dies mid-run instead of dropping it
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "fail-stale-projects": {
+            "task": "app.worker.fail_stale_projects",
+            "schedule": 300.0,
+        },
+        "submit-narration-batches": {
+            "task": "app.worker.submit_narration_batches",
+            "schedule": 300.0,
+        },
+        "collect-narration-batches": {
+            "task": "app.worker.collect_narration_batches",
+            "schedule": 60.0,
+        },
+    },
+)
+
+# Tiers whose scripts wait for the cheaper Message Batches API; paid plans
+# keep generating them directly
+BATCH_NARRATION_TIERS = {SubscriptionTier.FREE.value, SubscriptionTier.STARTER.value}
+
+# Message Batches expire after 24 hours; a project still parked well past
+# that lost its batch bookkeeping and is resumed without it
+BATCH_NARRATION_TIMEOUT = timedelta(hours=25)
+
+
+# One event loop per worker process, created on first use after the fork.
+# asyncio.run() would close the loop after every task and strand the
+# keep-alive connections held by module-level async clients.
+_loop = None
+
+
+def _run(coro):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        # Sized for overlapping S3 part uploads, asset downloads and TTS writes
+        _loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=settings.THREAD_POOL_MAX_WORKERS)
+        )
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+@celery.task(bind=True, max_retries=3)
+def process_project(self, project_id: int, gedcom_s3_key: str):
+    """
+    Process GEDCOM file and generate video
+    """
+    try:
+        _run(_process_project(project_id, gedcom_s3_key))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=30 * 2 ** self.request.retries)
+        _mark_failed(project_id, str(e))
+
+
+async def _process_project(project_id: int, gedcom_s3_key: str):
+    db = WorkerSessionLocal()
+    try:
+        # Update project status to processing
+        project = crud_project.project.get(db=db, id=project_id)
+        if not project:
+            return
+        # Read before the update so the commit's expiry doesn't force a reload
+        title = project.title
+        batch_narration = project.owner.subscription_tier in BATCH_NARRATION_TIERS
+
+        project = crud_project.project.update(
+            db=db,
+            db_obj=project,
+            obj_in={
+                "status": "processing",
+                "processing_started_at": func.now()
+            }
+        )
+
+        # Fetch and process GEDCOM file
+        parsed_data = await process_gedcom_file(gedcom_s3_key)
+
+        if batch_narration:
+            # Park the project until its script comes back from the batch;
+            # pending keeps the wait out of the processing timeout
+            crud_project.project.update(
+                db=db,
+                db_obj=project,
+                obj_in={
+                    "status": "pending",
+                    "parsed_data": parsed_data,
+                    "story_themes": parsed_data.get("narrative_themes", [])
+                }
+            )
+            await enqueue_batch_narration(project_id, parsed_data, title)
+            return
+
+        await _generate_project(db, project, project_id, parsed_data, title)
+    finally:
+        db.close()
+
+
+@celery.task(bind=True, max_retries=3)
+def resume_project(self, project_id: int):
+    """
+    Generate the video for a project whose batch script has come back
+    """
+    try:
+        _run(_resume_project(project_id))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=30 * 2 ** self.request.retries)
+        _mark_failed(project_id, str(e))
+
+
+async def _resume_project(project_id: int):
+    db = WorkerSessionLocal()
+    try:
+        project = crud_project.project.get(db=db, id=project_id)
+        if not project or project.status != VideoStatus.PENDING.value:
+            return
+        title, parsed_data = project.title, project.parsed_data
+
+        project = crud_project.project.update(
+            db=db,
+            db_obj=project,
+            obj_in={
+                "status": "processing",
+                "processing_started_at": func.now()
+            }
+        )
+
+        await _generate_project(db, project, project_id, parsed_data, title)
+    finally:
+        db.close()
+
+
+async def _generate_project(db, project: Project, project_id: int, parsed_data: dict, title: str):
+    # Show the thumbnail while the rest of the video is still being made
+    def set_thumbnail(thumbnail_url: str):
+        crud_project.project.update(
+            db=db, db_obj=project, obj_in={"thumbnail_url": thumbnail_url}
+        )
+
+    # Generate video documentary
+    video_result = await generate_documentary(
+        project_id=project_id,
+        parsed_data=parsed_data,
+        title=title,
+        on_thumbnail=set_thumbnail
+    )
+
+    crud_project.project.set_transcript(
+        db=db, project_id=project_id, transcript=video_result["transcript"]
+    )
+
+    # Write parsed data and video results in a single statement
+    crud_project.project.update(
+        db=db,
+        db_obj=project,
+        obj_in={
+            "status": "completed",
+            "processing_completed_at": func.now(),
+            "parsed_data": parsed_data,
+            "story_themes": parsed_data.get("narrative_themes", []),
+            "video_url": video_result["video_url"],
+            "thumbnail_url": video_result["thumbnail_url"],
+            "transcript_url": video_result["transcript_url"],
+            "video_duration": video_result["duration"]
+        }
+    )
+
+
+def _mark_failed(project_id: int, error_message: str):
+    db = WorkerSessionLocal()
+    try:
+        project = crud_project.project.get(db=db, id=project_id)
+        if project:
+            crud_project.project.update(
+                db=db,
+                db_obj=project,
+                obj_in={
+                    "status": "failed",
+                    "processing_completed_at": func.now(),
+                    "error_message": error_message
+                }
+            )
+    finally:
+        db.close()
+
+
+@celery.task
+def fail_stale_projects():
+    """
+    Fail projects left in processing by a worker that never finished them,
+    and resume parked batch-tier projects whose batch was never collected
+    """
+    # Compare against the database clock, which stamped processing_started_at
+    cutoff = func.now() - timedelta(minutes=settings.PROCESSING_TIMEOUT_MINUTES)
+    db = WorkerSessionLocal()
+    try:
+        parked = (
+            db.query(Project.id)
+            .filter(
+                Project.status == VideoStatus.PENDING.value,
+                Project.parsed_data.isnot(None),
+                Project.processing_started_at < func.now() - BATCH_NARRATION_TIMEOUT
+            )
+            .all()
+        )
+        # Resumed projects without a batch script generate it directly
+        for (project_id,) in parked:
+            resume_project.delay(project_id)
+        
+        stale = (
+            db.query(Project)
+            .filter(
+                Project.status == VideoStatus.PROCESSING.value,
+                Project.processing_started_at < cutoff
+            )
+            .all()
+        )
+        for project in stale:
+            crud_project.project.update(
+                db=db,
+                db_obj=project,
+                obj_in={
+                    "status": "failed",
+                    "processing_completed_at": func.now(),
+                    "error_message": "Processing timed out"
+                }
+            )
+    finally:
+        db.close()
+
+
+@celery.task
+def submit_narration_batches():
+    """
+    Submit queued standard-tier scripts to the Message Batches API
+    """
+    while _run(submit_narration_batch()):
+        pass
+
+
+@celery.task
+def collect_narration_batches():
+    """
+    Resume the projects whose narration batch has finished
+    """
+    _run(collect_batch_scripts(resume_project.delay))
@@ -24,11 +24,18 @@ export default function GedcomUpload({ onClose }: GedcomUploadProps) {
   const queryClient = useQueryClient()
 
   const createProject = useMutation({
-    mutationFn: async (formData: FormData) => {
-      const response = await axios.post('/projects', formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
+    mutationFn: async ({ file, title }: { file: File; title: string }) => {
+      // Upload straight to S3 with a presigned POST, then register the key
+      const { data: ticket } = await axios.post('/projects/presign')
+
+      const formData = new FormData()
+      Object.entries(ticket.fields as Record<string, string>).forEach(
+        ([key, value]) => formData.append(key, value)
+      )
+      formData.append('file', file)
+
+      // Bare instance so the API auth header isn't sent to S3
+      await axios.create().post(ticket.url, formData, {
         onUploadProgress: (progressEvent) => {
           if (progressEvent.total) {
             const progress = Math.round(
@@ -38,6 +45,11 @@ export default function GedcomUpload({ onClose }: GedcomUploadProps) {
           }
         },
       })
+
+      const response = await axios.post('/projects/from-upload', {
+        title,
+        gedcom_s3_key: ticket.s3_key,
+      })
       return response.data
     },
     onSuccess: () => {
@@ -68,11 +80,7 @@ export default function GedcomUpload({ onClose }: GedcomUploadProps) {
   const handleSubmit = () => {
     if (!file || !projectTitle) return
 
-    const formData = new FormData()
-    formData.append('gedcom_file', file)
-    formData.append('title', projectTitle)
-    
-    createProject.mutate(formData)
+    createProject.mutate({ file, title: projectTitle })
   }
 
   return (
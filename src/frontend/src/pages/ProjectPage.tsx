@@ -31,6 +31,16 @@ export default function ProjectPage() {
     }
   })
 
+  // Fetched separately so the project payload stays small
+  const { data: transcript } = useQuery({
+    queryKey: ['project', id, 'transcript'],
+    queryFn: async () => {
+      const response = await axios.get(`/projects/${id}/transcript`)
+      return response.data.transcript as string | null
+    },
+    enabled: project?.status === 'completed'
+  })
+
   const togglePlayPause = () => {
     if (videoRef.current) {
       if (isPlaying) {
@@ -182,7 +192,7 @@ export default function ProjectPage() {
                 <h2 className="text-xl font-semibold mb-4">Transcript</h2>
                 <div className="prose prose-sm max-w-none">
                   <p className="text-muted-foreground whitespace-pre-wrap">
-                    {project.transcript || 'No transcript available'}
+                    {transcript || 'No transcript available'}
                   </p>
                 </div>
               </div>